@@ -0,0 +1,84 @@
+import os
+from attendance_output import write_output
+
+# 默认的上下班时间，用于判断迟到和早退
+DEFAULT_WORK_START = '09:00'
+DEFAULT_WORK_END = '18:00'
+
+# 统计的考勤状态；外出按外勤计
+STATUS_COLUMNS = {'请假': ('请假',), '休息': ('休息',), '外勤': ('外勤', '外出')}
+
+# 统计表的列：逐人逐日、按人汇总、按人按月汇总
+DAILY_COLUMNS = ['姓名', '日期', '月份', '工时(小时)', '迟到', '早退', '请假', '休息', '外勤']
+SUMMARY_COLUMNS = ['出勤天数', '总工时(小时)', '平均工时(小时)', '迟到次数', '早退次数', '请假天数', '休息天数', '外勤天数']
+
+# 汇总时求和的逐日列及其汇总列名（出勤：工时大于 0 的一天）
+SUM_COLUMNS = {'出勤': '出勤天数', '工时(小时)': '总工时(小时)', '迟到': '迟到次数', '早退': '早退次数',
+               '请假': '请假天数', '休息': '休息天数', '外勤': '外勤天数'}
+
+# 计算逐人逐日的统计：净工时（扣除与午休重叠的部分）、是否迟到/早退、请假/休息/外勤
+# processed_df 为紧凑表示（见 attendance_schema），打卡时间已是分钟数，午休时间取自 attrs
+# 姓名、日期和月份为分类类型，分组时只比较整数编码
+def daily_stats(processed_df, work_start=DEFAULT_WORK_START, work_end=DEFAULT_WORK_END):
+    import numpy as np
+    import pandas as pd
+    from attendance_schema import DATE_FORMAT, LUNCH_ATTR, MISSING_MINUTES, date_labels, parse_minutes, to_minutes
+
+    start = processed_df['上班分钟'].to_numpy(dtype=np.int32, na_value=MISSING_MINUTES)
+    end = processed_df['下班分钟'].to_numpy(dtype=np.int32, na_value=MISSING_MINUTES)
+    # 午休时间无效时不扣除
+    lunch_start, lunch_end = to_minutes(pd.Series(processed_df.attrs.get(LUNCH_ATTR, ('', '')), dtype=object)).astype(np.int32)
+
+    punched = (start != MISSING_MINUTES) & (end != MISSING_MINUTES) & (end > start)
+    has_lunch = lunch_start != MISSING_MINUTES and lunch_end != MISSING_MINUTES
+    lunch_overlap = np.clip(np.minimum(end, lunch_end) - np.maximum(start, lunch_start), 0, None) * has_lunch
+    net_minutes = np.where(punched, end - start - lunch_overlap, 0)
+
+    date_codes, dates = pd.factorize(processed_df['日期'])
+    dates = date_labels(dates)
+    # 月份取自解析后的日期，"2024-9-1" 这类未补零的日期也归到 "2024-09"；无法解析的取前 7 个字符
+    labels = pd.Series(dates, dtype=object)
+    parsed = pd.to_datetime(labels, format=DATE_FORMAT, errors='coerce')
+    month_codes, months = pd.factorize(parsed.dt.strftime('%Y-%m').fillna(labels.str[:7]))
+
+    columns = {
+        '姓名': processed_df['姓名'].array,
+        '日期': pd.Categorical.from_codes(date_codes, dates),
+        '月份': pd.Categorical.from_codes(month_codes[date_codes], months),
+        '工时(小时)': net_minutes / 60,
+        '迟到': (start != MISSING_MINUTES) & (start > parse_minutes(work_start)),
+        '早退': (end != MISSING_MINUTES) & (end < parse_minutes(work_end)),
+    }
+    # 上班或下班任一打卡为该状态即计为该状态的一天
+    for column, statuses in STATUS_COLUMNS.items():
+        columns[column] = (processed_df['上班状态'].isin(statuses) | processed_df['下班状态'].isin(statuses)).to_numpy()
+    return pd.DataFrame(columns, columns=DAILY_COLUMNS)
+
+# 按 keys 分组汇总逐日统计
+def summarize(daily, keys):
+    grouped = daily.assign(出勤=daily['工时(小时)'] > 0).groupby(keys, sort=False, observed=True)
+    summary = grouped[list(SUM_COLUMNS)].sum().rename(columns=SUM_COLUMNS)
+    summary['平均工时(小时)'] = summary['总工时(小时)'] / summary['出勤天数'].where(summary['出勤天数'] > 0)
+    summary = summary[SUMMARY_COLUMNS].round({'总工时(小时)': 2, '平均工时(小时)': 2})
+    return summary.reset_index()
+
+# 计算全部统计表：{'daily': 逐人逐日, 'person': 按人, 'month': 按人按月}
+def analyze_attendance(processed_df, work_start=DEFAULT_WORK_START, work_end=DEFAULT_WORK_END):
+    daily = daily_stats(processed_df, work_start, work_end)
+    return {
+        'daily': daily,
+        'person': summarize(daily, ['姓名']),
+        'month': summarize(daily, ['姓名', '月份']),
+    }
+
+# 各统计表的输出路径：在输出文件名后加上 _daily、_person、_month
+def summary_files(summary_file):
+    base, ext = os.path.splitext(summary_file)
+    return {name: f'{base}_{name}{ext}' for name in ('daily', 'person', 'month')}
+
+# 将统计表按所选格式写出，返回写出的文件路径列表
+def write_summary(tables, summary_file, formats=('xlsx',)):
+    written = []
+    for name, path in summary_files(summary_file).items():
+        written.extend(write_output(tables[name], path, formats))
+    return written
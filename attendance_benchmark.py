@@ -0,0 +1,131 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+import datetime
+import platform
+import importlib.util
+
+import attendance_excel
+from attendance_analytics import analyze_attendance
+from attendance_output import write_output
+from attendance_schema import concat_attendance, display_attendance
+from attendance_generator import generate_workbook, parse_mix
+from benchmark_utils import DEFAULT_THRESHOLD, find_regressions, measure
+
+# 按文件路径加载 考勤2.0.py（文件名含有 "."，不能直接 import）
+def load_kaoqin():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '考勤2.0.py')
+    spec = importlib.util.spec_from_file_location('kaoqin', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+# 对 attendance_excel.py 的各阶段计时
+def bench_excel(workdir, employees, days, mix, repeat, formats):
+    input_file = os.path.join(workdir, 'excel_input.xlsx')
+    generate_workbook(input_file, 'excel', employees, days, mix)
+
+    timings = {}
+    timings['read'], data = measure(lambda: attendance_excel.read_attendance(input_file), repeat)
+    timings['parse'], processed_df = measure(lambda: attendance_excel.reshape_attendance(data), repeat)
+    for fmt in formats:
+        output_file = os.path.join(workdir, f'excel_output.{fmt}')
+        timings[f'write_{fmt}'], _ = measure(lambda: write_output(display_attendance(processed_df), output_file, [fmt]), repeat)
+    plot_file = os.path.join(workdir, 'excel_plot.png')
+    timings['plot'], _ = measure(
+        lambda: attendance_excel.plot_attendance(processed_df, plot_file, 'png', '考勤', '日期', '时间', 'pages'), 1)
+    return timings, len(processed_df)
+
+# 对 考勤2.0.py 的各阶段计时
+def bench_kaoqin(workdir, employees, days, mix, repeat, formats):
+    kaoqin = load_kaoqin()
+    input_file = os.path.join(workdir, 'kaoqin_input.xlsx')
+    generate_workbook(input_file, 'kaoqin', employees, days, mix)
+
+    def parse():
+        # 每次都从冷缓存开始，避免第二次运行只测到缓存命中
+        kaoqin.clear_parse_cache()
+        return kaoqin.parse_attendance(data)
+
+    timings = {}
+    timings['read'], data = measure(lambda: kaoqin.read_attendance(input_file), repeat)
+    timings['parse'], processed_df = measure(parse, repeat)
+    for fmt in formats:
+        output_file = os.path.join(workdir, f'kaoqin_output.{fmt}')
+        timings[f'write_{fmt}'], _ = measure(lambda: write_output(display_attendance(processed_df), output_file, [fmt]), repeat)
+    output_file = os.path.join(workdir, 'kaoqin_stream.xlsx')
+    timings['stream'], _ = measure(lambda: kaoqin.stream_attendance(input_file, output_file), repeat)
+    return timings, len(processed_df)
+
+# 对批量模式的合并和输出计时：一个工作簿的日期补零（日期类型），另一个不补零（保留为分类字符串）
+def bench_batch(workdir, employees, days, mix, repeat, formats):
+    input_files = [
+        generate_workbook(os.path.join(workdir, 'batch_padded.xlsx'), 'excel', employees, days, mix),
+        generate_workbook(os.path.join(workdir, 'batch_unpadded.xlsx'), 'excel', employees, days, mix, seed=1,
+                          start_date=datetime.date(2024, 10, 1), pad_dates=False),
+    ]
+    frames = [attendance_excel.load_attendance(input_file) for input_file in input_files]
+
+    timings = {}
+    timings['concat'], processed_df = measure(lambda: concat_attendance(frames), repeat)
+    for fmt in formats:
+        output_file = os.path.join(workdir, f'batch_output.{fmt}')
+        timings[f'write_{fmt}'], _ = measure(lambda: write_output(display_attendance(processed_df), output_file, [fmt]), repeat)
+    timings['analyze'], _ = measure(lambda: analyze_attendance(processed_df), repeat)
+    return timings, len(processed_df)
+
+# 运行全部基准测试
+def run_benchmarks(employees, days, mix=None, repeat=3, formats=('xlsx', 'csv')):
+    timings = {}
+    rows = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for suite, bench in [('excel', bench_excel), ('kaoqin', bench_kaoqin), ('batch', bench_batch)]:
+            suite_timings, rows[suite] = bench(workdir, employees, days, mix, repeat, formats)
+            for stage, seconds in suite_timings.items():
+                timings[f'{suite}.{stage}'] = seconds
+    return {
+        'employees': employees,
+        'days': days,
+        'rows': rows,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'timings': timings,
+    }
+
+# 主函数
+def main():
+    parser = argparse.ArgumentParser(description='考勤处理性能基准测试。')
+    parser.add_argument('--employees', type=int, default=1000, help='人数（默认: 1000）')
+    parser.add_argument('--days', type=int, default=31, help='天数（默认: 31）')
+    parser.add_argument('--mix', type=str, default=None, help='单元格类型比例，例如 正常=0.8,休息=0.1,请假=0.05,外勤=0.05')
+    parser.add_argument('--repeat', type=int, default=3, help='每个阶段的重复次数，取最短时间（默认: 3）')
+    parser.add_argument('--formats', type=str, nargs='+', default=['xlsx', 'csv'], help='要测试的输出格式（默认: xlsx csv）')
+    parser.add_argument('--output', type=str, default=None, help='将结果保存为 JSON 文件')
+    parser.add_argument('--baseline', type=str, default=None, help='基线 JSON 文件；有阶段超过阈值时以非零状态退出')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='回归阈值（默认: 0.2，即慢 20%%）')
+
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix) if args.mix else None
+    results = run_benchmarks(args.employees, args.days, mix, args.repeat, args.formats)
+
+    for name, seconds in results['timings'].items():
+        print(f'{name:24s} {seconds * 1000:10.1f} ms')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.threshold)
+        for name, base, seconds in regressions:
+            print(f'性能回归: {name} {base * 1000:.1f} ms -> {seconds * 1000:.1f} ms')
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import os
+import pickle
+import shutil
+import hashlib
+import tempfile
+
+# 默认缓存目录（位于输入文件所在目录）
+CACHE_DIR_NAME = '.attendance_cache'
+
+# 解析缓存默认的大小上限（字节）
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# 超过上限时淘汰到上限的这个比例，避免每写一个条目都要淘汰一次
+EVICT_RATIO = 0.9
+
+# 缓存条目的扩展名
+ENTRY_SUFFIX = '.pkl'
+
+# 内部列：记录在原表中的行位置，用于按列合并后恢复逐人逐日的顺序
+ROW_COLUMN = '_row'
+
+# 计算文件内容的 SHA-256 摘要
+def file_digest(path, salt=''):
+    digest = hashlib.sha256(salt.encode('utf-8'))
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# 计算一列取值的摘要（向量化哈希，避免逐个单元格序列化）
+def values_digest(values):
+    import pandas as pd
+
+    hashes = pd.util.hash_pandas_object(pd.Series(values, dtype=object).astype(str), index=False)
+    return hashlib.sha256(hashes.to_numpy().tobytes()).hexdigest()
+
+# 计算一个日期列的摘要：由列名、姓名列摘要和该列单元格共同决定
+def column_digest(salt, label, names_digest, values):
+    key = f'{salt}\0{label}\0{names_digest}\0{values_digest(values)}'
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+# 以内容摘要为键的磁盘缓存，每个条目一个 pickle 文件；总大小超过上限时按最近使用时间淘汰
+# 多个进程可同时使用同一目录，各自记录的总大小只是估计值，淘汰时重新扫描目录
+class ParseCache:
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self.total_bytes = sum(size for _, size, _ in self.scan())
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key + ENTRY_SUFFIX)
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            # 更新修改时间作为最近使用时间
+            os.utime(path)
+        except Exception:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        path = self.path(key)
+        try:
+            self.total_bytes -= os.path.getsize(path)
+        except OSError:
+            pass
+        # 先写临时文件再原子替换，多个进程同时写同一条目也不会读到半个文件
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            self.total_bytes += f.tell()
+        os.replace(temp_path, path)
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+
+    # 列出缓存条目 [(修改时间, 大小, 路径)]；扫描期间被其他进程删除的条目直接跳过
+    def scan(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(ENTRY_SUFFIX):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    # 按最近使用时间从旧到新删除条目，直到总大小降到上限的 EVICT_RATIO 以下
+    def evict(self):
+        entries = sorted(self.scan())
+        self.total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self.total_bytes <= self.max_bytes * EVICT_RATIO:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.total_bytes -= size
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.total_bytes = 0
+
+# 默认缓存目录：输入文件旁的 .attendance_cache
+def default_cache_dir(input_file):
+    return os.path.join(os.path.dirname(os.path.abspath(input_file)), CACHE_DIR_NAME)
+
+# 逐列读取缓存，只解析缺失的列；parse_column(i) 需返回带 _row 列的 DataFrame
+def cached_column_frames(cache, keys, parse_column):
+    frames = []
+    for i, key in enumerate(keys):
+        frame = cache.get(key)
+        if frame is None:
+            frame = parse_column(i)
+            cache.put(key, frame)
+        frames.append(frame)
+    return frames
+
+# 合并按列解析的结果，恢复为逐人逐日（行优先）的顺序
+def merge_column_frames(frames, columns):
+    import numpy as np
+    import pandas as pd
+
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    merged = pd.concat(frames, ignore_index=True)
+    order = np.argsort(merged[ROW_COLUMN].to_numpy(), kind='stable')
+    return merged.iloc[order][columns].reset_index(drop=True)
@@ -1,135 +1,550 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import re
-import os
-import argparse
-import logging
-
-# 检查字符串是否为有效时间格式 (HH:MM)
-def is_time_format(s):
-    return bool(re.match(r"^\d{2}:\d{2}$", s))
-
-# 处理考勤数据并生成图表的函数
-def process_attendance(input_file, output_file, plot_file, plot_format, chart_title, xlabel, ylabel):
-    try:
-        # 读取原始数据
-        data = pd.read_excel(input_file, sheet_name='Sheet1')
-    except Exception as e:
-        logging.error(f"读取输入文件出错: {e}")
-        return
-
-    # 初始化一个空列表来存储处理后的记录
-    processed_records = []
-
-    # 获取包含日期和星期的表头行
-    header_row = data.iloc[0]
-
-    # 遍历每个人的数据（从第二行开始）
-    for index, row in data.iterrows():
-        if index == 0:
-            continue  # 跳过表头行
-        name = row['姓名']
-        
-        # 遍历每一天的考勤数据
-        for col in range(6, len(row)):  # 遍历每一列
-            if ' ' not in header_row[col]:
-                continue  # 跳过不包含日期和星期信息的列
-            
-            date_info = header_row[col].split(' ')
-            date = date_info[0]
-            day_of_week = date_info[1]
-            
-            attendance_info = row[col]
-            if not pd.isna(attendance_info):
-                attendance_info_split = attendance_info.split(',')
-                if len(attendance_info_split) == 2:
-                    start_time = attendance_info_split[0].replace('正常(', '').replace(')', '')
-                    end_time = attendance_info_split[1].replace('正常(', '').replace(')', '')
-                    
-                    # 将处理后的记录添加到列表中
-                    processed_records.append([name, date, day_of_week, start_time, '12:00', '13:30', end_time])
-                else:
-                    # 对于不完整的记录，仍然添加日期和姓名，但时间为空
-                    processed_records.append([name, date, day_of_week, None, '12:00', '13:30', None])
-
-    # 从处理后的记录创建一个 DataFrame
-    processed_df = pd.DataFrame(processed_records, columns=['姓名', '日期', '星期', '上班时间', '午休开始', '午休结束', '下班时间'])
-
-    # 将无效的时间记录替换为 "-"
-    processed_df['上班时间'] = processed_df['上班时间'].apply(lambda x: x if is_time_format(str(x)) else '-')
-    processed_df['下班时间'] = processed_df['下班时间'].apply(lambda x: x if is_time_format(str(x)) else '-')
-
-    try:
-        # 将清理后的 DataFrame 保存为新的 Excel 文件
-        processed_df.to_excel(output_file, index=False)
-    except Exception as e:
-        logging.error(f"写入输出文件出错: {e}")
-        return
-
-    # 为每个人的数据创建字典
-    attendance_dict = {}
-
-    for index, row in processed_df.iterrows():
-        name = row['姓名']
-        date = row['日期']
-        start_time = row['上班时间']
-        end_time = row['下班时间']
-        
-        if name not in attendance_dict:
-            attendance_dict[name] = {'dates': [], 'start_times': [], 'end_times': []}
-        
-        attendance_dict[name]['dates'].append(date)
-        attendance_dict[name]['start_times'].append(start_time)
-        attendance_dict[name]['end_times'].append(end_time)
-
-    # 设置字体以确保中文显示正确
-    plt.rcParams['font.sans-serif'] = ['SimHei']  # 使用黑体
-    plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
-
-    # 创建图表
-    fig, ax = plt.subplots(figsize=(12, 8))
-
-    for name, data in attendance_dict.items():
-        ax.plot(data['dates'], data['start_times'], marker='o', linestyle='-', label=f'{name} - 上班时间')
-        ax.plot(data['dates'], data['end_times'], marker='x', linestyle='--', label=f'{name} - 下班时间')
-
-    # 设置图表格式
-    plt.xlabel(xlabel)
-    plt.ylabel(ylabel)
-    plt.title(chart_title)
-    plt.xticks(rotation=45)
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-
-    try:
-        # 保存图表为文件
-        plt.savefig(plot_file, format=plot_format)
-        plt.show()
-    except Exception as e:
-        logging.error(f"保存图表文件出错: {e}")
-
-# 主函数
-def main():
-    parser = argparse.ArgumentParser(description='处理考勤数据并生成图表。')
-    parser.add_argument('--input', type=str, required=True, help='输入 Excel 文件路径')
-    parser.add_argument('--output', type=str, required=True, help='输出 Excel 文件路径')
-    parser.add_argument('--plot', type=str, required=True, help='输出图表文件路径')
-    parser.add_argument('--format', type=str, default='png', choices=['png', 'pdf', 'svg'], help='图表文件格式（默认: png）')
-    parser.add_argument('--title', type=str, default='每日考勤时间分布', help='图表标题')
-    parser.add_argument('--xlabel', type=str, default='日期', help='X轴标签')
-    parser.add_argument('--ylabel', type=str, default='时间', help='Y轴标签')
-
-    args = parser.parse_args()
-
-    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-    
-    if os.path.exists(args.input):
-        process_attendance(args.input, args.output, args.plot, args.format, args.title, args.xlabel, args.ylabel)
-        logging.info(f'处理后的数据已保存到 {args.output}')
-        logging.info(f'图表已保存到 {args.plot}')
-    else:
-        logging.error(f'输入文件 {args.input} 不存在')
-
-if __name__ == "__main__":
-    main()
+import re
+import os
+import glob
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from attendance_output import OUTPUT_FORMATS, output_paths, write_output
+from attendance_metrics import NO_METRICS, RunMetrics
+from attendance_ingest import INGEST_SUFFIX, LAYOUT_SHEETS, is_current, is_ingested, read_ingested
+from attendance_analytics import DEFAULT_WORK_END, DEFAULT_WORK_START, analyze_attendance, summary_files, write_summary
+from attendance_cache import (ROW_COLUMN, ParseCache, cached_column_frames, column_digest, file_digest, merge_column_frames,
+                              values_digest)
+
+# 输出表格的列名
+OUTPUT_COLUMNS = ['姓名', '日期', '星期', '上班时间', '午休开始', '午休结束', '下班时间']
+
+# 午休时间（原始表格中没有，输出时对每一行都相同）
+LUNCH_START = '12:00'
+LUNCH_END = '13:30'
+
+# 中文字体候选（按顺序尝试）
+CJK_FONTS = ['SimHei', 'Microsoft YaHei', 'WenQuanYi Micro Hei', 'Noto Sans CJK SC', 'DejaVu Sans']
+
+# combined 模式下绘制图例的最大人数
+LEGEND_LIMIT = 20
+
+# pages 模式下每页的列数
+PAGE_COLUMNS = 4
+
+# 纵轴刻度间隔的候选值（分钟），刻度总落在整点或半点；取刻度数不超过 MAX_TICKS 的最小间隔
+TICK_STEPS = (30, 60, 120, 180, 240, 360)
+MAX_TICKS = 12
+
+# pages 模式的小图只有几厘米高，纵轴和横轴的刻度数上限更小；每个刻度都要创建和排版，刻度越少绘图越快
+PAGE_MAX_TICKS = 6
+PAGE_DATE_BINS = 6
+
+# 解析缓存的命名空间；解析规则变化时修改版本号使旧缓存失效
+CACHE_SALT = 'attendance_excel/2'
+
+# pandas、numpy 和 matplotlib 导入较慢，只在用到它们的函数中导入：
+# --help、参数错误等不处理数据的运行不导入它们，不画图的运行不导入 matplotlib
+
+# 检查字符串是否为有效时间格式 (HH:MM)
+def is_time_format(s):
+    return bool(re.match(r"^\d{2}:\d{2}$", s))
+
+# 解析表头行中的 "日期 星期" 标签，返回 (列位置, 日期, 星期) 列表
+def parse_header(header_row):
+    day_columns = []
+    for col in range(6, len(header_row)):
+        label = header_row.iloc[col]
+        if not isinstance(label, str) or ' ' not in label:
+            continue  # 跳过不包含日期和星期信息的列
+        date_info = label.split(' ')
+        day_columns.append((col, date_info[0], date_info[1]))
+    return day_columns
+
+# 清理 "正常(HH:MM)" 片段，无效时间替换为 "-"
+def clean_punch(parts):
+    times = parts.str.replace('正常(', '', regex=False).str.replace(')', '', regex=False)
+    return times.where(times.str.match(r"^\d{2}:\d{2}$"), '-')
+
+# 将原始宽表向量化地转换为每人每天一行的记录（紧凑表示，见 attendance_schema）；传入缓存时只解析内容变化的日期列
+def reshape_attendance(data, cache=None, metrics=NO_METRICS):
+    import pandas as pd
+    from attendance_schema import compact_attendance
+
+    with metrics.stage('header') as counts:
+        day_columns = parse_header(data.iloc[0])
+        counts['columns'] = len(data.columns)
+    body = data.iloc[1:]
+    if not day_columns or body.empty:
+        processed_df = pd.DataFrame(columns=OUTPUT_COLUMNS)
+    elif cache is None:
+        processed_df = reshape_days(body, day_columns, metrics=metrics)
+    else:
+        names_digest = values_digest(body['姓名'])
+        keys = [
+            column_digest(CACHE_SALT, f'{date} {weekday}', names_digest, body.iloc[:, col])
+            for col, date, weekday in day_columns
+        ]
+        frames = cached_column_frames(cache, keys, lambda i: reshape_days(body, [day_columns[i]], with_rows=True, metrics=metrics))
+        processed_df = merge_column_frames(frames, OUTPUT_COLUMNS)
+
+    with metrics.stage('compact') as counts:
+        processed_df = compact_attendance(processed_df, LUNCH_START, LUNCH_END)
+        counts['rows'] = len(processed_df)
+    return processed_df
+
+# 展开指定的日期列；with_rows 为 True 时附带每条记录在原表中的行位置
+def reshape_days(body, day_columns, with_rows=False, metrics=NO_METRICS):
+    import numpy as np
+    import pandas as pd
+
+    positions = [col for col, _, _ in day_columns]
+    dates = np.array([date for _, date, _ in day_columns], dtype=object)
+    weekdays = np.array([weekday for _, _, weekday in day_columns], dtype=object)
+
+    with metrics.stage('parse') as counts:
+        # 按行展开（与逐人逐列遍历的顺序一致），只保留非空单元格
+        cells = body.iloc[:, positions].to_numpy(dtype=object).ravel()
+        mask = pd.notna(cells)
+        row_index = np.repeat(np.arange(len(body)), len(positions))[mask]
+        col_index = np.tile(np.arange(len(positions)), len(body))[mask]
+
+        # 同一单元格文本在整张表中大量重复，只对去重后的取值做字符串解析
+        codes, uniques = pd.factorize(pd.Series(cells[mask], dtype=object).astype(str))
+        uniques = pd.Series(uniques, dtype=object)
+
+        # 恰好包含一个逗号的单元格才是完整的上下班记录
+        complete = uniques.str.count(',') == 1
+        split = uniques.str.partition(',')
+        start_times = clean_punch(split[0]).where(complete, '-').to_numpy(dtype=object)[codes]
+        end_times = clean_punch(split[2]).where(complete, '-').to_numpy(dtype=object)[codes]
+        counts['cells'] = len(cells)
+        counts['unique_cells'] = len(uniques)
+
+    with metrics.stage('build') as counts:
+        processed_df = pd.DataFrame({
+            '姓名': body['姓名'].to_numpy(dtype=object)[row_index],
+            '日期': dates[col_index],
+            '星期': weekdays[col_index],
+            '上班时间': start_times,
+            '午休开始': LUNCH_START,
+            '午休结束': LUNCH_END,
+            '下班时间': end_times,
+        }, columns=OUTPUT_COLUMNS)
+        if with_rows:
+            processed_df[ROW_COLUMN] = row_index
+        counts['rows'] = len(processed_df)
+    return processed_df
+
+# 打卡分钟数转换为浮点数组，缺失的打卡记为 NaN（不画点）
+def punch_minutes(minutes):
+    import numpy as np
+
+    return minutes.to_numpy(dtype=float, na_value=np.nan)
+
+# 按姓名分组，生成绘图所需的字典（保持首次出现的顺序）
+# 日期转换为横轴位置，上下班时间为分钟数
+def group_by_person(processed_df):
+    import numpy as np
+    import pandas as pd
+
+    codes, names = pd.factorize(processed_df['姓名'], use_na_sentinel=False)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.cumsum(np.bincount(codes, minlength=len(names)))[:-1]
+    positions, _ = pd.factorize(processed_df['日期'], sort=True)
+
+    def split(values):
+        return np.split(values[order], bounds)
+
+    attendance_dict = {}
+    for name, x, start_minutes, end_minutes in zip(
+            names, split(positions), split(punch_minutes(processed_df['上班分钟'])),
+            split(punch_minutes(processed_df['下班分钟']))):
+        attendance_dict[name] = {'x': x, 'start_minutes': start_minutes, 'end_minutes': end_minutes}
+    return attendance_dict
+
+# 读取原始考勤工作簿；已转换的 .arrow 文件以内存映射方式打开
+def read_attendance(input_file):
+    import pandas as pd
+
+    if is_ingested(input_file):
+        return read_ingested(input_file, header=0, sheet_name=LAYOUT_SHEETS['excel'])
+    return pd.read_excel(input_file, sheet_name=LAYOUT_SHEETS['excel'])
+
+# 读取工作簿并记录读取阶段的统计
+def read_workbook(input_file, metrics=NO_METRICS):
+    with metrics.stage('read') as counts:
+        data = read_attendance(input_file)
+        counts['rows'] = len(data)
+        counts['cells'] = data.size
+    return data
+
+# 读取并解析单个工作簿；指定缓存目录时复用内容未变化的解析结果
+def load_attendance(input_file, cache_dir=None, metrics=NO_METRICS):
+    if cache_dir is None:
+        data = read_workbook(input_file, metrics)
+        return reshape_attendance(data, metrics=metrics)
+
+    # 整个工作簿未变化时直接复用上次的结果，连读取都可以省掉
+    cache = ParseCache(cache_dir)
+    workbook_key = file_digest(input_file, CACHE_SALT)
+    processed_df = cache.get(workbook_key)
+    if processed_df is None:
+        data = read_workbook(input_file, metrics)
+        processed_df = reshape_attendance(data, cache, metrics)
+        cache.put(workbook_key, processed_df)
+    logging.info(f'解析缓存：命中 {cache.hits} 项，未命中 {cache.misses} 项')
+    return processed_df
+
+# 处理考勤数据并生成图表的函数
+def process_attendance(input_file, output_file, plot_file, plot_format, chart_title, xlabel, ylabel, output_formats=('xlsx',),
+                       cache_dir=None, plot_mode='combined', per_page=20, workers=None, metrics=NO_METRICS, summary_file=None,
+                       work_hours=(DEFAULT_WORK_START, DEFAULT_WORK_END)):
+    try:
+        # 读取原始数据并将宽表转长表、解析打卡时间
+        processed_df = load_attendance(input_file, cache_dir, metrics)
+    except Exception as e:
+        logging.error(f"读取输入文件出错: {e}")
+        return
+
+    save_results(processed_df, output_file, plot_file, plot_format, chart_title, xlabel, ylabel, output_formats,
+                 plot_mode, per_page, workers, metrics, summary_file, work_hours)
+
+# 保存处理结果、统计表（指定 summary_file 时）并生成图表（指定 plot_file 时）；work_hours 为 (上班时间, 下班时间)，用于判断迟到和早退
+def save_results(processed_df, output_file, plot_file, plot_format, chart_title, xlabel, ylabel, output_formats=('xlsx',),
+                 plot_mode='combined', per_page=20, workers=None, metrics=NO_METRICS, summary_file=None,
+                 work_hours=(DEFAULT_WORK_START, DEFAULT_WORK_END)):
+    from attendance_schema import display_attendance
+
+    try:
+        # 将清理后的 DataFrame 按所选格式保存（默认 Excel）
+        with metrics.stage('write') as counts:
+            write_output(display_attendance(processed_df), output_file, output_formats)
+            counts['rows'] = len(processed_df)
+            counts['cells'] = processed_df.size
+    except Exception as e:
+        logging.error(f"写入输出文件出错: {e}")
+        return
+    # 只在写出成功后报告输出路径
+    log_output_paths(output_file, output_formats)
+
+    if summary_file:
+        try:
+            with metrics.stage('analyze') as counts:
+                tables = analyze_attendance(processed_df, *work_hours)
+                counts['rows'] = len(processed_df)
+            with metrics.stage('write_summary') as counts:
+                summary_paths = write_summary(tables, summary_file, output_formats)
+                counts['rows'] = sum(len(table) for table in tables.values())
+        except Exception as e:
+            logging.error(f"生成统计表出错: {e}")
+            return
+        logging.info(f'统计表已保存到 {", ".join(summary_paths)}')
+
+    if not plot_file:
+        return
+    try:
+        with metrics.stage('plot') as counts:
+            plot_files = plot_attendance(processed_df, plot_file, plot_format, chart_title, xlabel, ylabel, plot_mode, per_page,
+                                         workers)
+            counts['rows'] = len(processed_df)
+    except Exception as e:
+        logging.error(f"保存图表文件出错: {e}")
+        return
+
+    if len(plot_files) == 1:
+        logging.info(f'图表已保存到 {plot_files[0]}')
+    else:
+        logging.info(f'图表已保存到 {plot_files[0]} 等 {len(plot_files)} 个文件')
+
+# 导入 pyplot 并使用无界面后端，服务器上也能直接生成图表
+def load_pyplot():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+# 设置字体以确保中文显示正确
+def setup_fonts(plt):
+    plt.rcParams['font.sans-serif'] = CJK_FONTS
+    plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
+
+# 所有人的打卡分钟数（不含缺失的打卡）
+def all_minutes(people):
+    import numpy as np
+
+    minutes = np.concatenate([np.empty(0)] + [data[key] for _, data in people for key in ('start_minutes', 'end_minutes')])
+    return minutes[~np.isnan(minutes)]
+
+# 按所有人打卡时间的范围选取纵轴刻度间隔（分钟）
+def tick_step(people, max_ticks=MAX_TICKS):
+    minutes = all_minutes(people)
+    span = minutes.max() - minutes.min() if len(minutes) else 0
+    for step in TICK_STEPS:
+        if span / step <= max_ticks:
+            return step
+    return TICK_STEPS[-1]
+
+# 设置坐标轴：纵轴按 HH:MM 显示分钟数、每 step 分钟一个刻度，横轴按日期显示位置、最多 date_bins 个刻度
+def format_axes(ax, dates, step, date_bins=10, grid=True):
+    from matplotlib.ticker import FuncFormatter, MaxNLocator, MultipleLocator
+
+    ax.yaxis.set_major_locator(MultipleLocator(step))
+    ax.yaxis.set_major_formatter(FuncFormatter(lambda value, _: f'{int(value) // 60:02d}:{int(value) % 60:02d}'))
+    ax.xaxis.set_major_locator(MaxNLocator(nbins=date_bins, integer=True))
+    ax.xaxis.set_major_formatter(FuncFormatter(lambda value, _: dates[int(value)] if 0 <= value < len(dates) else ''))
+    ax.grid(grid)
+
+# 绘制考勤图表：combined 将所有人画在一张图中，pages 为每人一个小图并分页并行渲染
+def plot_attendance(processed_df, plot_file, plot_format, chart_title, xlabel, ylabel, plot_mode='combined', per_page=20, workers=None):
+    import pandas as pd
+    from attendance_schema import date_labels
+
+    # 日期标签按日期排序（与 group_by_person 中的横轴位置一致）
+    dates = list(date_labels(pd.factorize(processed_df['日期'], sort=True)[1]))
+    people = list(group_by_person(processed_df).items())
+
+    if plot_mode == 'combined' or not people:
+        render_combined(people, dates, plot_file, plot_format, chart_title, xlabel, ylabel)
+        return [plot_file]
+
+    pages = [people[i:i + per_page] for i in range(0, len(people), per_page)]
+    base, ext = os.path.splitext(plot_file)
+    page_files = [f'{base}_{page + 1:03d}{ext}' for page in range(len(pages))]
+    tasks = [
+        (page_people, dates, page_file, plot_format, f'{chart_title} ({page + 1}/{len(pages)})', xlabel, ylabel)
+        for page, (page_people, page_file) in enumerate(zip(pages, page_files))
+    ]
+    if len(tasks) == 1:
+        render_page(*tasks[0])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(render_page, *zip(*tasks)))
+    return page_files
+
+# 将所有人的上下班时间画在同一张图中
+def render_combined(people, dates, plot_file, plot_format, chart_title, xlabel, ylabel):
+    plt = load_pyplot()
+    setup_fonts(plt)
+    fig, ax = plt.subplots(figsize=(12, 8))
+
+    for name, data in people:
+        ax.plot(data['x'], data['start_minutes'], marker='o', linestyle='-', label=f'{name} - 上班时间')
+        ax.plot(data['x'], data['end_minutes'], marker='x', linestyle='--', label=f'{name} - 下班时间')
+
+    # 设置图表格式
+    format_axes(ax, dates, tick_step(people))
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(chart_title)
+    ax.tick_params(axis='x', labelrotation=45)
+    # 人数太多时图例会比图本身还大，此时不再绘制
+    if len(people) <= LEGEND_LIMIT:
+        ax.legend()
+    fig.tight_layout()
+
+    try:
+        # 保存图表为文件
+        fig.savefig(plot_file, format=plot_format)
+    finally:
+        plt.close(fig)
+
+# 在 [low, high] 两侧留出与自动缩放相同的边距
+def padded_limits(low, high, margin):
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    pad = (high - low) * margin
+    return low - pad, high + pad
+
+# 渲染一页小图，每人一个子图（在工作进程中运行）
+# 每个刻度都要创建多个图元并排版，几十个子图时刻度占绘图时间的大部分：
+# 所有子图使用相同的坐标范围，只有最左列和每列最下方的子图创建刻度，网格直接画成线段
+def render_page(people, dates, plot_file, plot_format, chart_title, xlabel, ylabel):
+    from matplotlib.ticker import MaxNLocator, MultipleLocator, NullLocator
+
+    plt = load_pyplot()
+    setup_fonts(plt)
+    ncols = min(PAGE_COLUMNS, len(people))
+    nrows = -(-len(people) // ncols)
+    fig, axes = plt.subplots(nrows, ncols, figsize=(4 * ncols, 2.8 * nrows), squeeze=False)
+
+    step = tick_step(people, PAGE_MAX_TICKS)
+    minutes = all_minutes(people)
+    xlim = padded_limits(0, max(len(dates) - 1, 0), plt.rcParams['axes.xmargin'])
+    ylim = padded_limits(minutes.min(), minutes.max(), plt.rcParams['axes.ymargin']) if len(minutes) else (0, 24 * 60)
+    # 与 format_axes 中的定位器相同，网格线与刻度位置一致
+    xticks = [x for x in MaxNLocator(nbins=PAGE_DATE_BINS, integer=True).tick_values(*xlim) if xlim[0] <= x <= xlim[1]]
+    yticks = [y for y in MultipleLocator(step).tick_values(*ylim) if ylim[0] <= y <= ylim[1]]
+    grid = {key: plt.rcParams[f'grid.{key}'] for key in ('color', 'linestyle', 'linewidth', 'alpha')}
+
+    for i, (ax, (name, data)) in enumerate(zip(axes.flat, people)):
+        ax.plot(data['x'], data['start_minutes'], marker='o', markersize=3, linestyle='-', label='上班时间')
+        ax.plot(data['x'], data['end_minutes'], marker='x', markersize=3, linestyle='--', label='下班时间')
+        # 固定标题位置：自动定位要测量每个子图的刻度标签
+        ax.set_title(str(name), fontsize=10, y=1.0)
+        ax.set_xlim(xlim)
+        ax.set_ylim(ylim)
+        ax.vlines(xticks, *ylim, zorder=0.5, **grid)
+        ax.hlines(yticks, *xlim, zorder=0.5, **grid)
+        format_axes(ax, dates, step, PAGE_DATE_BINS, grid=False)
+        if i % ncols:
+            ax.yaxis.set_major_locator(NullLocator())
+        if i + ncols < len(people):
+            ax.xaxis.set_major_locator(NullLocator())
+        ax.tick_params(axis='x', labelrotation=45, labelsize=8)
+    for ax in axes.flat[len(people):]:
+        ax.set_visible(False)
+
+    axes[0][0].legend(fontsize=8)
+    fig.suptitle(chart_title)
+    fig.supxlabel(xlabel)
+    fig.supylabel(ylabel)
+    # 固定边距：几十个子图时 tight_layout 需要反复测量所有刻度，比绘图本身还慢
+    fig.subplots_adjust(left=0.06, right=0.98, bottom=0.1, top=0.92, hspace=0.35, wspace=0.08)
+
+    try:
+        fig.savefig(plot_file, format=plot_format)
+    finally:
+        plt.close(fig)
+    return plot_file
+
+# 展开批量输入：目录取其中所有 .xlsx 和已转换的 .arrow 文件，否则按通配符匹配
+# 同一工作簿既有 .xlsx 又有转换后的 .arrow 时，.arrow 与 .xlsx 一致才读取 .arrow，否则读取 .xlsx
+def find_workbooks(pattern):
+    if os.path.isdir(pattern):
+        files = glob.glob(os.path.join(pattern, '*.xlsx')) + glob.glob(os.path.join(pattern, '*' + INGEST_SUFFIX))
+    else:
+        files = glob.glob(pattern)
+    # 跳过 Excel 打开文件时生成的临时文件
+    files = [f for f in files if os.path.isfile(f) and not os.path.basename(f).startswith('~$')]
+    workbooks = {os.path.splitext(f)[0]: f for f in files if not is_ingested(f)}
+    # 每个工作簿只读取一个文件：.arrow 与同名 .xlsx 一致时跳过 .xlsx，否则跳过 .arrow
+    skipped = set()
+    for f in files:
+        source_file = workbooks.get(os.path.splitext(f)[0])
+        if not is_ingested(f) or source_file is None:
+            continue
+        if is_current(f, source_file):
+            skipped.add(source_file)
+        else:
+            logging.warning(f'{source_file} 在转换为 {f} 之后已被修改，改为读取 {source_file}（可重新运行 attendance_ingest.py）')
+            skipped.add(f)
+    return sorted(f for f in files if f not in skipped)
+
+# 判断 --input 是否为批量输入（目录或通配符）
+def is_batch_input(pattern):
+    return os.path.isdir(pattern) or glob.has_magic(pattern)
+
+# 在工作进程中读取并解析单个工作簿，返回 (文件, 结果, 错误信息)
+def load_workbook_records(input_file, cache_dir=None):
+    try:
+        return input_file, load_attendance(input_file, cache_dir), None
+    except Exception as e:
+        return input_file, None, str(e)
+
+# 批量处理多个工作簿：并行解析，合并后统一输出，单个文件失败不影响其他文件
+def process_batch(input_files, output_file, plot_file, plot_format, chart_title, xlabel, ylabel, workers=None, output_formats=('xlsx',),
+                  cache_dir=None, plot_mode='combined', per_page=20, metrics=NO_METRICS, summary_file=None,
+                  work_hours=(DEFAULT_WORK_START, DEFAULT_WORK_END)):
+    from attendance_schema import concat_attendance
+
+    frames = []
+    failures = []
+
+    # 读取和解析在工作进程中进行，这里只统计整体耗时
+    with metrics.stage('batch_load') as counts, ProcessPoolExecutor(max_workers=workers) as executor:
+        for input_file, processed_df, error in executor.map(load_workbook_records, input_files, [cache_dir] * len(input_files)):
+            if error is None:
+                frames.append(processed_df)
+                logging.info(f'已处理 {input_file}（{len(processed_df)} 条记录）')
+            else:
+                failures.append((input_file, error))
+                logging.error(f'处理 {input_file} 出错: {error}')
+        counts['rows'] = sum(len(frame) for frame in frames)
+
+    if frames:
+        with metrics.stage('build'):
+            processed_df = concat_attendance(frames)
+        save_results(processed_df, output_file, plot_file, plot_format, chart_title, xlabel, ylabel, output_formats,
+                     plot_mode, per_page, workers, metrics, summary_file, work_hours)
+    else:
+        logging.error('没有成功处理的输入文件')
+
+    return failures
+
+# 记录每种输出格式的保存路径
+def log_output_paths(output_file, output_formats):
+    for _, path in output_paths(output_file, output_formats):
+        logging.info(f'处理后的数据已保存到 {path}')
+
+# 至少为 1 的整数参数
+def positive_int(text):
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f'必须为正整数: {text}')
+    return value
+
+# 主函数
+def main():
+    parser = argparse.ArgumentParser(description='处理考勤数据并生成图表。')
+    parser.add_argument('--input', type=str, required=True, help='输入 Excel 文件（或 attendance_ingest.py 转换后的 .arrow 文件）路径；也可以是目录或通配符（批量模式）')
+    parser.add_argument('--output', type=str, required=True, help='输出 Excel 文件路径')
+    parser.add_argument('--output-format', type=str, nargs='+', default=['xlsx'], choices=list(OUTPUT_FORMATS),
+                        help='输出文件格式，可同时指定多个；多个格式时按格式替换 --output 的扩展名（默认: xlsx）')
+    parser.add_argument('--plot', type=str, default=None, help='输出图表文件路径（不指定时只输出表格，不生成图表）')
+    parser.add_argument('--format', type=str, default='png', choices=['png', 'pdf', 'svg'], help='图表文件格式（默认: png）')
+    parser.add_argument('--title', type=str, default='每日考勤时间分布', help='图表标题')
+    parser.add_argument('--xlabel', type=str, default='日期', help='X轴标签')
+    parser.add_argument('--ylabel', type=str, default='时间', help='Y轴标签')
+    parser.add_argument('--plot-mode', type=str, default='combined', choices=['combined', 'pages'],
+                        help='combined: 所有人画在一张图中；pages: 每人一个小图，按页输出多个文件（默认: combined）')
+    parser.add_argument('--per-page', type=positive_int, default=20, help='pages 模式下每页的人数（默认: 20）')
+    parser.add_argument('--cache-dir', type=str, default=None, help='解析缓存目录；指定后只重新解析内容变化的日期列')
+    parser.add_argument('--clear-cache', action='store_true', help='运行前清空解析缓存')
+    parser.add_argument('--metrics', type=str, nargs='?', const='', default=None,
+                        help='记录各阶段耗时、峰值内存和行数，每次运行输出一条 JSON 记录；可指定追加写入的文件')
+    parser.add_argument('--workers', type=positive_int, default=None, help='批量解析和分页绘图的并行进程数（默认: CPU 核数）')
+    parser.add_argument('--summary', type=str, default=None,
+                        help='同时生成工时统计：逐人逐日、按人、按人按月三张表，分别保存为该路径加 _daily、_person、_month 后缀的文件')
+    parser.add_argument('--work-start', type=str, default=DEFAULT_WORK_START, help=f'上班时间，晚于此时间打卡计为迟到（默认: {DEFAULT_WORK_START}）')
+    parser.add_argument('--work-end', type=str, default=DEFAULT_WORK_END, help=f'下班时间，早于此时间打卡计为早退（默认: {DEFAULT_WORK_END}）')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    from attendance_schema import parse_minutes
+    try:
+        parse_minutes(args.work_start)
+        parse_minutes(args.work_end)
+    except ValueError as e:
+        logging.error(str(e))
+        return
+    work_hours = (args.work_start, args.work_end)
+
+    if args.clear_cache and args.cache_dir:
+        ParseCache(args.cache_dir).clear()
+        logging.info(f'已清空解析缓存 {args.cache_dir}')
+
+    metrics = RunMetrics('attendance_excel', args.input, enabled=args.metrics is not None, output_file=args.metrics or None)
+
+    if is_batch_input(args.input):
+        # 输出文件和统计表可能位于输入目录中，不能当作输入再读一遍
+        outputs = [args.output] + (list(summary_files(args.summary).values()) if args.summary else [])
+        output_set = {os.path.abspath(path) for path in outputs}
+        input_files = [f for f in find_workbooks(args.input) if os.path.abspath(f) not in output_set]
+        if not input_files:
+            logging.error(f'没有找到匹配 {args.input} 的输入文件')
+            return
+
+        failures = process_batch(input_files, args.output, args.plot, args.format, args.title, args.xlabel, args.ylabel,
+                                 args.workers, args.output_format, args.cache_dir, args.plot_mode, args.per_page, metrics,
+                                 args.summary, work_hours)
+        logging.info(f'批量处理完成：成功 {len(input_files) - len(failures)} 个，失败 {len(failures)} 个')
+    elif os.path.exists(args.input):
+        process_attendance(args.input, args.output, args.plot, args.format, args.title, args.xlabel, args.ylabel,
+                           args.output_format, args.cache_dir, args.plot_mode, args.per_page, args.workers, metrics,
+                           args.summary, work_hours)
+    else:
+        logging.error(f'输入文件 {args.input} 不存在')
+        return
+
+    metrics.emit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import argparse
+import datetime
+import numpy as np
+
+# 星期名称（datetime.weekday() 的顺序）
+WEEKDAYS = ['星期一', '星期二', '星期三', '星期四', '星期五', '星期六', '星期日']
+
+# 默认的单元格类型比例
+DEFAULT_MIX = {'正常': 0.8, '休息': 0.1, '请假': 0.05, '外勤': 0.05}
+
+# 正常出勤中只有一次打卡的比例
+SINGLE_PUNCH_RATE = 0.05
+
+# 解析 "正常=0.8,休息=0.1" 形式的比例配置
+def parse_mix(text):
+    mix = {}
+    for item in text.split(','):
+        status, _, weight = item.partition('=')
+        status = status.strip()
+        if status not in DEFAULT_MIX:
+            raise ValueError(f"不支持的考勤类型: {status}")
+        mix[status] = float(weight)
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError("考勤类型比例之和必须大于 0")
+    return {status: weight / total for status, weight in mix.items()}
+
+# 生成 "HH:MM" 字符串数组
+def format_minutes(minutes):
+    return np.char.add(np.char.add(np.char.zfill((minutes // 60).astype(str), 2), ':'),
+                       np.char.zfill((minutes % 60).astype(str), 2))
+
+# 按比例随机生成 employees × days 的考勤单元格（钉钉导出格式）
+def generate_cells(employees, days, mix=None, seed=0):
+    mix = mix or DEFAULT_MIX
+    rng = np.random.default_rng(seed)
+    shape = (employees, days)
+
+    statuses = rng.choice(list(mix), size=shape, p=list(mix.values()))
+    # 上班 08:30~09:30，下班 17:30~19:00
+    start = format_minutes(rng.integers(8 * 60 + 30, 9 * 60 + 31, size=shape))
+    end = format_minutes(rng.integers(17 * 60 + 30, 19 * 60 + 1, size=shape))
+
+    normal = np.char.add(np.char.add(np.char.add(np.char.add('正常(', start), '),正常('), end), ')')
+    single = np.char.add(np.char.add('正常(', start), ')')
+    field = np.char.add(np.char.add(np.char.add(np.char.add('外勤(', start), '),正常('), end), ')')
+
+    cells = np.empty(shape, dtype=object)
+    cells[statuses == '正常'] = normal[statuses == '正常']
+    single_mask = (statuses == '正常') & (rng.random(shape) < SINGLE_PUNCH_RATE)
+    cells[single_mask] = single[single_mask]
+    cells[statuses == '外勤'] = field[statuses == '外勤']
+    cells[statuses == '休息'] = '休息'
+    cells[statuses == '请假'] = '请假'
+    return cells
+
+# 生成日期列标签，例如 '2024-09-01 星期日'；pad_dates 为 False 时月和日不补零，例如 '2024-9-1 星期日'
+def date_labels(start_date, days, pad_dates=True):
+    return [
+        f'{day:%Y-%m-%d} {WEEKDAYS[day.weekday()]}' if pad_dates else f'{day.year}-{day.month}-{day.day} {WEEKDAYS[day.weekday()]}'
+        for day in (start_date + datetime.timedelta(days=i) for i in range(days))
+    ]
+
+# 生成 attendance_excel.py 使用的布局：第一行列名，第二行为 "日期 星期" 表头
+def write_excel_layout(path, names, labels, cells):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Sheet1')
+    sheet.append(['姓名', '考勤组', '部门', '工号', '职位', 'UserId'] + [f'day{i + 1}' for i in range(len(labels))])
+    sheet.append(['', '', '', '', '', ''] + labels)
+    for i, (name, row) in enumerate(zip(names, cells)):
+        sheet.append([name, '默认考勤组', '研发部', f'{i + 1:06d}', '工程师', f'u{i + 1}'] + row.tolist())
+    workbook.save(path)
+
+# 生成 考勤2.0.py 使用的布局：第一行标题，第二行列名（含 迟到时长(小时)）
+def write_kaoqin_layout(path, names, labels, cells):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Sheet1')
+    sheet.append([f'月度汇总 统计日期：{labels[0].split(" ")[0]} 至 {labels[-1].split(" ")[0]}'])
+    sheet.append(['姓名', '考勤组', '部门', '工号', '职位', 'UserId', '出勤天数', '迟到次数', '迟到时长(小时)'] + labels)
+    for i, (name, row) in enumerate(zip(names, cells)):
+        sheet.append([name, '默认考勤组', '研发部', f'{i + 1:06d}', '工程师', f'u{i + 1}', len(labels), 0, 0] + row.tolist())
+    workbook.save(path)
+
+# 生成一个合成考勤工作簿
+def generate_workbook(path, layout='excel', employees=100, days=31, mix=None, seed=0, start_date=datetime.date(2024, 9, 1),
+                      pad_dates=True):
+    names = [f'员工{i + 1:05d}' for i in range(employees)]
+    labels = date_labels(start_date, days, pad_dates)
+    cells = generate_cells(employees, days, mix, seed)
+    if layout == 'excel':
+        write_excel_layout(path, names, labels, cells)
+    elif layout == 'kaoqin':
+        write_kaoqin_layout(path, names, labels, cells)
+    else:
+        raise ValueError(f"不支持的布局: {layout}")
+    return path
+
+# 主函数
+def main():
+    parser = argparse.ArgumentParser(description='生成钉钉格式的合成考勤工作簿。')
+    parser.add_argument('--output', type=str, required=True, help='输出 Excel 文件路径')
+    parser.add_argument('--layout', type=str, default='excel', choices=['excel', 'kaoqin'],
+                        help='excel: attendance_excel.py 的布局；kaoqin: 考勤2.0.py 的布局（默认: excel）')
+    parser.add_argument('--employees', type=int, default=100, help='人数（默认: 100）')
+    parser.add_argument('--days', type=int, default=31, help='天数（默认: 31）')
+    parser.add_argument('--mix', type=str, default=None, help='单元格类型比例，例如 正常=0.8,休息=0.1,请假=0.05,外勤=0.05')
+    parser.add_argument('--start', type=str, default='2024-09-01', help='起始日期（默认: 2024-09-01）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子（默认: 0）')
+    parser.add_argument('--no-pad-dates', action='store_true', help='日期的月和日不补零，例如 2024-9-1')
+
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix) if args.mix else None
+    start_date = datetime.date.fromisoformat(args.start)
+    generate_workbook(args.output, args.layout, args.employees, args.days, mix, args.seed, start_date, not args.no_pad_dates)
+    print(f'已生成 {args.output}（{args.employees} 人 × {args.days} 天）')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import os
+import argparse
+import logging
+from attendance_cache import file_digest
+
+# 转换后的二进制文件扩展名（Arrow IPC 文件格式，未压缩，可直接内存映射）
+INGEST_SUFFIX = '.arrow'
+
+# 流式读取时每批的行数
+ROW_BATCH_SIZE = 4096
+
+# 各考勤表布局读取的工作表：attendance_excel.py 读取 Sheet1，考勤2.0.py 读取第一个工作表
+LAYOUT_SHEETS = {'excel': 'Sheet1', 'kaoqin': 0}
+
+# 判断输入是否为已转换的二进制文件
+def is_ingested(path):
+    return str(path).lower().endswith(INGEST_SUFFIX)
+
+# 默认输出路径：与原文件同名，扩展名为 .arrow
+def default_ingest_path(input_file):
+    return os.path.splitext(input_file)[0] + INGEST_SUFFIX
+
+# 将一列单元格转换为 Arrow 数组；类型混杂的列统一转换为字符串
+def to_arrow_array(pa, values):
+    import pandas as pd
+
+    try:
+        return pa.array(values, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if pd.isna(value) else str(value) for value in values], type=pa.string())
+
+# 一次性将原始考勤工作簿转换为列式二进制文件；保留所有行（含表头行），由读取方决定表头位置
+# sheet_name 为序号时按序号取工作表，元数据中记录实际的工作表名称
+def ingest_workbook(input_file, output_file=None, sheet_name=0):
+    import pandas as pd
+    import pyarrow as pa
+
+    output_file = output_file or default_ingest_path(input_file)
+    with pd.ExcelFile(input_file) as workbook:
+        if isinstance(sheet_name, int):
+            sheet_name = workbook.sheet_names[sheet_name]
+        raw = workbook.parse(sheet_name, header=None, dtype=object)
+    arrays = [to_arrow_array(pa, raw[col].tolist()) for col in raw.columns]
+    table = pa.Table.from_arrays(arrays, names=[f'c{i}' for i in range(len(arrays))])
+    table = table.replace_schema_metadata({
+        'source': os.path.basename(input_file),
+        'source_sha256': file_digest(input_file),
+        'sheet': str(sheet_name),
+    })
+
+    # 先写临时文件再替换，避免其他进程读到写了一半的文件
+    temp_file = output_file + '.tmp'
+    with pa.OSFile(temp_file, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=ROW_BATCH_SIZE)
+    os.replace(temp_file, output_file)
+    return output_file
+
+# 判断转换后的文件是否仍与原工作簿一致：不早于原工作簿，或记录的原工作簿摘要与当前内容相同
+# 旧版本转换的文件没有记录摘要，只比较修改时间
+def is_current(ingested_file, source_file):
+    import pyarrow as pa
+
+    if os.path.getmtime(ingested_file) >= os.path.getmtime(source_file):
+        return True
+    with pa.memory_map(ingested_file, 'r') as source:
+        metadata = pa.ipc.open_file(source).schema.metadata or {}
+    digest = metadata.get(b'source_sha256')
+    return digest is not None and digest.decode('utf-8') == file_digest(source_file)
+
+# 按 pandas read_excel 的规则命名列：空列名为 'Unnamed: i'，重复列名追加 '.1'、'.2'
+def header_names(values):
+    import pandas as pd
+
+    names = []
+    seen = {}
+    for i, value in enumerate(values):
+        name = f'Unnamed: {i}' if value is None or pd.isna(value) else value
+        if name in seen:
+            seen[name] += 1
+            name = f'{name}.{seen[name]}'
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+# 以内存映射方式打开转换后的文件，返回与 pd.read_excel(header=header) 相同结构的 DataFrame
+# 只转换一次：表头行单独取出，数据行直接转换为 pandas 的列类型（缺失值为 NaN），不再逐个转换为 Python 对象
+# 指定 sheet_name 时检查文件是否由该工作表转换而来，避免与读取 Excel 文件时读到不同的工作表
+def read_ingested(path, header=0, sheet_name=None):
+    import pyarrow as pa
+
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    sheet = (table.schema.metadata or {}).get(b'sheet', b'').decode('utf-8')
+    if sheet_name is not None and sheet != str(sheet_name):
+        raise ValueError(f'{path} 转换自工作表 {sheet}，应为 {sheet_name}（转换时使用 --sheet {sheet_name}）')
+    if table.num_rows <= header:
+        return table.slice(0, 0).to_pandas()
+    columns = header_names(table.slice(header, 1).to_pylist()[0].values())
+    data = table.slice(header + 1).to_pandas()
+    data.columns = columns
+    return data
+
+# 以内存映射方式逐行读取转换后的文件，每行为一个元组（空单元格为 None）
+# 文件在调用时立即打开，打开失败会直接抛出异常，而不是推迟到第一次迭代
+def iter_ingested_rows(path):
+    import pyarrow as pa
+
+    source = pa.memory_map(path, 'r')
+    try:
+        reader = pa.ipc.open_file(source)
+    except Exception:
+        source.close()
+        raise
+
+    def rows():
+        try:
+            for i in range(reader.num_record_batches):
+                columns = reader.get_batch(i).to_pydict().values()
+                yield from zip(*columns)
+        finally:
+            source.close()
+
+    return rows()
+
+# 主函数
+def main():
+    parser = argparse.ArgumentParser(description='将原始考勤工作簿一次性转换为可内存映射的列式二进制文件。')
+    parser.add_argument('--input', type=str, required=True, help='输入 Excel 文件路径')
+    parser.add_argument('--output', type=str, default=None, help='输出文件路径（默认: 与输入同名的 .arrow 文件）')
+    parser.add_argument('--sheet', type=str, default=None, help='工作表名称（默认: 按 --layout 选择）')
+    parser.add_argument('--layout', type=str, default='kaoqin', choices=list(LAYOUT_SHEETS),
+                        help='表格布局：excel 为 attendance_excel.py 使用的 Sheet1，kaoqin 为 考勤2.0.py 使用的第一个工作表（默认: kaoqin）')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if not os.path.exists(args.input):
+        logging.error(f'输入文件 {args.input} 不存在')
+        return
+    try:
+        output_file = ingest_workbook(args.input, args.output, args.sheet if args.sheet is not None else LAYOUT_SHEETS[args.layout])
+    except Exception as e:
+        logging.error(f"转换输入文件出错: {e}")
+        return
+    logging.info(f'已转换为 {output_file}')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# 任务被取消时由处理代码抛出
+class JobCancelled(Exception):
+    pass
+
+# 一个后台处理任务的进度和取消控制
+# 处理代码每进入一个阶段调用 stage，每处理一行调用 advance；进度放入队列，由界面线程定时读取
+# 不在后台运行时使用 NO_JOB，各方法都不做任何事
+class JobControl:
+    def __init__(self, name=None, outputs=(), progress_queue=None):
+        self.name = name
+        self.outputs = frozenset(outputs)
+        self.progress_queue = progress_queue
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    def cancel(self):
+        self.cancel_event.set()
+        if self.future is not None:
+            # 还在排队的任务直接取消，正在运行的任务在处理下一行时停止
+            self.future.cancel()
+
+    # 已请求取消时抛出 JobCancelled
+    def check(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    # 进入新的阶段；total 为 None 表示进度未知
+    def stage(self, name, total=None):
+        self.advance(name, 0, total)
+
+    def advance(self, stage, done, total=None):
+        self.check()
+        self.report(stage, done, total)
+
+    # 只报告进度，不检查取消；用于已开始写出、不能再中途停止的阶段
+    def report(self, stage, done=0, total=None):
+        if self.progress_queue is not None:
+            self.progress_queue.put((self, stage, done, total))
+
+# 未在后台运行时使用的空对象
+NO_JOB = JobControl()
+
+# 比较输出路径时使用的键
+def output_key(path):
+    return os.path.normcase(os.path.abspath(path))
+
+# 单线程任务队列：任务按提交顺序在同一个后台线程中执行，同一时间只有一个任务在读写文件
+# 同一个输出文件同时只允许有一个任务（排队或运行中），避免两个任务写同一个文件
+# 本类不调用任何界面函数，由界面线程定时调用 latest_progress 和 finished_jobs
+class JobRunner:
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.progress_queue = queue.Queue()
+        self.jobs = []
+
+    # 已被排队或运行中的任务占用的输出文件
+    def busy_outputs(self, outputs):
+        busy = set().union(*(job.outputs for job in self.jobs))
+        return [path for path in outputs if output_key(path) in busy]
+
+    # 提交任务 func(job)；输出文件被占用时返回 None
+    def submit(self, name, outputs, func):
+        if self.busy_outputs(outputs):
+            return None
+        job = JobControl(name, (output_key(path) for path in outputs), self.progress_queue)
+        job.future = self.executor.submit(func, job)
+        self.jobs.append(job)
+        return job
+
+    # 队列中最新的进度 (任务, 阶段, 已完成, 总数)，没有新进度时返回 None
+    def latest_progress(self):
+        latest = None
+        while True:
+            try:
+                latest = self.progress_queue.get_nowait()
+            except queue.Empty:
+                return latest
+
+    # 取出已结束（完成、出错或取消）的任务
+    def finished_jobs(self):
+        finished = [job for job in self.jobs if job.future.done()]
+        self.jobs = [job for job in self.jobs if job not in finished]
+        return finished
+
+    def cancel_all(self):
+        for job in self.jobs:
+            job.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,98 @@
+import os
+import sys
+import json
+import time
+import logging
+import datetime
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块
+    resource = None
+
+# 峰值常驻内存（MB）：who 为 'self' 时是当前进程整次运行的最高值，为 'children' 时是已结束的子进程（如批量处理的工作进程）中的最高值
+# 无法获取时返回 None
+def peak_rss_mb(who='self'):
+    if resource is not None:
+        usage = resource.getrusage(resource.RUSAGE_SELF if who == 'self' else resource.RUSAGE_CHILDREN)
+        # Linux 以 KB 为单位，macOS 以字节为单位
+        return round(usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    if who != 'self':
+        return None
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, 'peak_wset', info.rss) / (1024 * 1024), 1)
+    except Exception:
+        return None
+
+# 当前进程此刻的常驻内存（MB），无法获取时返回 None
+def rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return round(int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().rss / (1024 * 1024), 1)
+    except Exception:
+        return None
+
+# 一次处理运行的分阶段计时和内存统计；disabled 时各方法都不做任何事
+class RunMetrics:
+    def __init__(self, script, input_file=None, enabled=True, output_file=None):
+        self.script = script
+        self.input_file = input_file
+        self.enabled = enabled
+        self.output_file = output_file
+        self.started = datetime.datetime.now().isoformat(timespec='seconds')
+        self.start_time = time.perf_counter()
+        self.stages = {}
+
+    # 对一个阶段计时；同名阶段多次出现时累加。调用方可在 yield 出的字典中填写 rows / cells / columns
+    # 内存记录阶段开始和结束时的常驻内存（同名阶段多次出现时为第一次开始和最后一次结束），峰值只在整次运行上记录
+    @contextmanager
+    def stage(self, name):
+        counts = {}
+        if not self.enabled:
+            yield counts
+            return
+        start_rss = rss_mb()
+        start = time.perf_counter()
+        try:
+            yield counts
+        finally:
+            record = self.stages.setdefault(name, {'name': name, 'seconds': 0.0, 'calls': 0, 'rss_start_mb': start_rss})
+            record['seconds'] += time.perf_counter() - start
+            record['calls'] += 1
+            record['rss_end_mb'] = rss_mb()
+            for key, value in counts.items():
+                record[key] = record.get(key, 0) + value
+
+    def to_dict(self):
+        stages = [dict(record, seconds=round(record['seconds'], 4)) for record in self.stages.values()]
+        return {
+            'script': self.script,
+            'input': self.input_file,
+            'started': self.started,
+            'total_seconds': round(time.perf_counter() - self.start_time, 4),
+            'peak_rss_mb': peak_rss_mb(),
+            'children_peak_rss_mb': peak_rss_mb('children'),
+            'stages': stages,
+        }
+
+    # 输出一条 JSON 记录：写入日志，并在指定文件时追加一行
+    def emit(self):
+        if not self.enabled:
+            return None
+        line = json.dumps(self.to_dict(), ensure_ascii=False)
+        logging.info(f'性能数据: {line}')
+        if self.output_file:
+            with open(self.output_file, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+        return line
+
+# 未开启统计时使用的空对象
+NO_METRICS = RunMetrics(None, enabled=False)
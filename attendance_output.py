@@ -0,0 +1,166 @@
+import os
+import csv
+
+# 支持的输出格式及其扩展名（xlsx 为默认格式）
+OUTPUT_FORMATS = {
+    'xlsx': '.xlsx',
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'feather': '.feather',
+}
+
+# 流式写出列式格式时每批缓存的行数
+BATCH_SIZE = 65536
+
+# 计算每种格式的输出路径：只有一种格式时直接使用给定路径，否则按格式替换扩展名
+def output_paths(output_file, formats=('xlsx',)):
+    formats = list(dict.fromkeys(formats))
+    for fmt in formats:
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"不支持的输出格式: {fmt}")
+    if len(formats) == 1:
+        return [(formats[0], output_file)]
+    base = os.path.splitext(output_file)[0]
+    return [(fmt, base + OUTPUT_FORMATS[fmt]) for fmt in formats]
+
+# 将 DataFrame 按指定格式写出，返回写出的文件路径列表
+def write_output(df, output_file, formats=('xlsx',)):
+    written = []
+    for fmt, path in output_paths(output_file, formats):
+        if fmt == 'xlsx':
+            df.to_excel(path, index=False)
+        elif fmt == 'csv':
+            # 带 BOM 的 UTF-8，Excel 打开时中文不会乱码
+            df.to_csv(path, index=False, encoding='utf-8-sig')
+        elif fmt == 'parquet':
+            df.to_parquet(path, index=False)
+        elif fmt == 'feather':
+            df.reset_index(drop=True).to_feather(path)
+        written.append(path)
+    return written
+
+# 逐行写出 xlsx（openpyxl 只写模式）
+class XlsxRecordWriter:
+    def __init__(self, path, columns):
+        from openpyxl import Workbook
+
+        self.path = path
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet()
+        self.sheet.append(columns)
+
+    def append(self, record):
+        self.sheet.append(record)
+
+    def close(self):
+        self.workbook.save(self.path)
+
+    # 只写模式下工作簿在保存时才写出文件，放弃时不保存即可；保存中途出错时删除写了一半的文件
+    def discard(self):
+        self.workbook = None
+        remove_partial(self.path)
+
+# 删除写了一半的输出文件；文件可能还没创建
+def remove_partial(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+# 逐行写出 csv
+class CsvRecordWriter:
+    def __init__(self, path, columns):
+        self.path = path
+        self.file = open(path, 'w', newline='', encoding='utf-8-sig')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def append(self, record):
+        self.writer.writerow(record)
+
+    def close(self):
+        self.file.close()
+
+    def discard(self):
+        self.file.close()
+        remove_partial(self.path)
+
+# 分批写出 parquet / feather（Arrow IPC），内存占用只与批大小有关
+class ArrowRecordWriter:
+    def __init__(self, path, columns, fmt):
+        import pyarrow as pa
+
+        self.pa = pa
+        self.path = path
+        self.columns = columns
+        # 流式模式下无法预知整列类型，统一按字符串列写出
+        self.schema = pa.schema([(col, pa.string()) for col in columns])
+        if fmt == 'parquet':
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(path, self.schema)
+        else:
+            self.writer = pa.ipc.new_file(path, self.schema)
+        self.rows = []
+
+    def append(self, record):
+        self.rows.append(record)
+        if len(self.rows) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        arrays = [
+            self.pa.array([None if row[i] is None else str(row[i]) for row in self.rows], type=self.pa.string())
+            for i in range(len(self.columns))
+        ]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+    # 写出出错后写入器可能已无法正常关闭，只需保证删除文件
+    def discard(self):
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+        remove_partial(self.path)
+
+# 同时向多种格式逐行写出
+class MultiRecordWriter:
+    def __init__(self, writers):
+        self.writers = writers
+        self.paths = [path for path, _ in writers]
+
+    def append(self, record):
+        for _, writer in self.writers:
+            writer.append(record)
+
+    def close(self):
+        for _, writer in self.writers:
+            writer.close()
+
+    # 放弃写出：关闭并删除已写出的部分文件（处理被取消或出错时使用）
+    def discard(self):
+        for _, writer in self.writers:
+            writer.discard()
+
+# 打开逐行写出器，用于流式处理
+# 某个格式打开失败时放弃已打开的其他格式
+def open_record_writer(output_file, columns, formats=('xlsx',)):
+    writers = []
+    try:
+        for fmt, path in output_paths(output_file, formats):
+            if fmt == 'xlsx':
+                writers.append((path, XlsxRecordWriter(path, columns)))
+            elif fmt == 'csv':
+                writers.append((path, CsvRecordWriter(path, columns)))
+            else:
+                writers.append((path, ArrowRecordWriter(path, columns, fmt)))
+    except Exception:
+        MultiRecordWriter(writers).discard()
+        raise
+    return MultiRecordWriter(writers)
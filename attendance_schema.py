@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+# 打卡单元格中除正常打卡时间外显示的考勤状态
+STATUSES = ['休息', '请假', '外出', '外勤']
+STATUS_DTYPE = pd.CategoricalDtype(STATUSES)
+
+# 日期列的格式；无法按此格式解析的日期保留为字符串
+DATE_FORMAT = '%Y-%m-%d'
+
+# 缺失或无效打卡的分钟数（用于 numpy 计算，紧凑表示中为 NA）
+MISSING_MINUTES = -1
+
+# 紧凑表示：姓名、星期为分类类型，日期为日期类型，打卡时间为距午夜的分钟数（可空 Int16），状态为 STATUS_DTYPE
+# 午休时间对整次运行都相同，不占用列，记录在 attrs['lunch'] 中；导出时才生成 DISPLAY_COLUMNS 的显示字符串
+COMPACT_COLUMNS = ['姓名', '日期', '星期', '上班分钟', '上班状态', '下班分钟', '下班状态']
+DISPLAY_COLUMNS = ['姓名', '日期', '星期', '上班时间', '午休开始', '午休结束', '下班时间']
+PUNCH_COLUMNS = {'上班时间': ('上班分钟', '上班状态'), '下班时间': ('下班分钟', '下班状态')}
+LUNCH_ATTR = 'lunch'
+
+# 按分钟数索引的 "HH:MM" 显示值
+MINUTE_LABELS = np.array([f'{minutes // 60:02d}:{minutes % 60:02d}' for minutes in range(24 * 60)], dtype=object)
+
+# 对一列取值去重编码，返回 (每行的编码, 去重后的取值)；同一取值在整列中大量重复，之后只需处理去重后的取值
+def factorize_column(values):
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return codes, pd.Series(uniques, dtype=object).astype(str)
+
+# 将 "HH:MM" 转换为距午夜的分钟数（int16），无效或缺失的记为 MISSING_MINUTES
+def unique_minutes(uniques):
+    parts = uniques.str.extract(r"^(\d{2}):(\d{2})$").astype(float)
+    valid = (parts[0] < 24) & (parts[1] < 60)
+    return (parts[0] * 60 + parts[1]).where(valid).fillna(MISSING_MINUTES).to_numpy(np.int16)
+
+def to_minutes(values):
+    codes, uniques = factorize_column(values)
+    return unique_minutes(uniques)[codes]
+
+# 单个 "HH:MM" 转换为分钟数，格式无效时抛出 ValueError
+def parse_minutes(text):
+    minutes = unique_minutes(pd.Series([text], dtype=object))[0]
+    if minutes == MISSING_MINUTES:
+        raise ValueError(f"无效的时间: {text}（应为 HH:MM）")
+    return int(minutes)
+
+def as_category(values):
+    codes, uniques = pd.factorize(values)
+    return pd.Categorical.from_codes(codes, uniques)
+
+# 日期转换为日期类型；有无法解析的日期，或格式化后与原文不同（如 "2024-9-1"）时保留为分类字符串，原文不变
+def encode_dates(values):
+    codes, uniques = factorize_column(values)
+    parsed = pd.to_datetime(uniques, format=DATE_FORMAT, errors='coerce')
+    if parsed.isna().any():
+        # 分类按字符串排序
+        return pd.Categorical.from_codes(codes, uniques).reorder_categories(sorted(uniques))
+    if not (parsed.dt.strftime(DATE_FORMAT) == uniques).all():
+        # 日期都能解析，分类按日期排序
+        return pd.Categorical.from_codes(codes, uniques).reorder_categories(uniques[parsed.argsort()])
+    return pd.DatetimeIndex(parsed).take(codes)
+
+# 将打卡显示值（"HH:MM"、状态或 "-"）转换为 (分钟数, 状态)
+def encode_punches(values):
+    codes, uniques = factorize_column(values)
+    minutes = unique_minutes(uniques)
+    statuses = pd.Categorical(uniques.where(uniques.isin(STATUSES)), dtype=STATUS_DTYPE).codes
+    minutes = pd.arrays.IntegerArray(minutes[codes], minutes[codes] == MISSING_MINUTES)
+    return minutes, pd.Categorical.from_codes(statuses[codes], dtype=STATUS_DTYPE)
+
+# 将显示格式的逐人逐日记录转换为紧凑表示
+def compact_attendance(display_df, lunch_start, lunch_end):
+    compact = pd.DataFrame({
+        '姓名': as_category(display_df['姓名']),
+        '日期': encode_dates(display_df['日期']),
+        '星期': as_category(display_df['星期']),
+    })
+    for column, (minutes_column, status_column) in PUNCH_COLUMNS.items():
+        compact[minutes_column], compact[status_column] = encode_punches(display_df[column])
+    compact.attrs[LUNCH_ATTR] = (lunch_start, lunch_end)
+    return compact[COMPACT_COLUMNS]
+
+# 合并多个紧凑表示；各表的姓名、星期分类不同，按并集重新编码
+# 分类取值的类型不一致时（例如空表）保留 pd.concat 的结果
+def concat_attendance(frames):
+    # 有的工作簿日期为日期类型、有的保留为分类字符串（见 encode_dates）时，统一转换为分类字符串再合并
+    if len({isinstance(frame['日期'].dtype, pd.CategoricalDtype) for frame in frames if len(frame)}) > 1:
+        frames = [frame.assign(日期=pd.Categorical(date_labels(frame['日期']))) for frame in frames]
+    result = pd.concat(frames, ignore_index=True)
+    parts = [frame for frame in frames if len(frame)]
+    for column in ('姓名', '日期', '星期'):
+        dtypes = [frame[column].dtype for frame in parts]
+        if parts and all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes) \
+                and len({dtype.categories.dtype for dtype in dtypes}) == 1:
+            result[column] = pd.api.types.union_categoricals([frame[column] for frame in parts], ignore_order=True)
+    result.attrs = dict(frames[0].attrs) if frames else {}
+    return result
+
+# 日期的显示字符串（按去重后的取值格式化）
+def date_labels(dates):
+    codes, uniques = pd.factorize(dates)
+    if isinstance(uniques, pd.DatetimeIndex):
+        uniques = uniques.strftime(DATE_FORMAT)
+    return np.asarray(uniques, dtype=object)[codes]
+
+# 打卡的显示字符串：有状态时显示状态，否则显示 "HH:MM"，都没有时显示 "-"
+def punch_labels(minutes, statuses):
+    minutes = minutes.to_numpy(dtype=np.int32, na_value=MISSING_MINUTES)
+    labels = np.full(len(minutes), '-', dtype=object)
+    valid = minutes != MISSING_MINUTES
+    labels[valid] = MINUTE_LABELS[minutes[valid]]
+    has_status = statuses.notna().to_numpy()
+    labels[has_status] = statuses[has_status].astype(object).to_numpy()
+    return labels
+
+# 导出前生成显示格式的表格（与原来的 7 列输出相同）
+def display_attendance(compact_df):
+    lunch_start, lunch_end = compact_df.attrs.get(LUNCH_ATTR, ('', ''))
+    return pd.DataFrame({
+        '姓名': compact_df['姓名'].to_numpy(dtype=object),
+        '日期': date_labels(compact_df['日期']),
+        '星期': compact_df['星期'].to_numpy(dtype=object),
+        '上班时间': punch_labels(compact_df['上班分钟'], compact_df['上班状态']),
+        '午休开始': lunch_start,
+        '午休结束': lunch_end,
+        '下班时间': punch_labels(compact_df['下班分钟'], compact_df['下班状态']),
+    }, columns=DISPLAY_COLUMNS)
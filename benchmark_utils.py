@@ -0,0 +1,24 @@
+import time
+
+# 默认的回归阈值：比基线慢 20% 以上视为回归
+DEFAULT_THRESHOLD = 0.2
+
+# 多次运行取最短时间，结果来自最后一次运行
+def measure(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+# 与基线比较，返回回归项列表 [(名称, 基线, 当前)]
+def find_regressions(results, baseline, threshold):
+    regressions = []
+    for name, seconds in results['timings'].items():
+        base = baseline.get('timings', {}).get(name)
+        if base is not None and seconds > base * (1 + threshold):
+            regressions.append((name, base, seconds))
+    return regressions
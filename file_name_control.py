@@ -1,61 +1,160 @@
-import os
+import time
+import queue
 import datetime
+import threading
 import tkinter as tk
-from tkinter import filedialog, messagebox
-
-# 用于保存原始文件名和路径的文件
-backup_file = "file_backup.txt"
-
-def save_original_names(directory):
-    with open(backup_file, "w") as f:
-        for filename in os.listdir(directory):
-            if os.path.isfile(os.path.join(directory, filename)):
-                f.write(f"{filename}\n")
-    messagebox.showinfo("备份完成", "文件名备份已保存")
-
-def add_suffix(directory, suffix):
-    save_original_names(directory)
-    for filename in os.listdir(directory):
-        if os.path.isfile(os.path.join(directory, filename)):
-            base, ext = os.path.splitext(filename)
-            new_name = base + suffix + ext
-            os.rename(os.path.join(directory, filename), os.path.join(directory, new_name))
-    messagebox.showinfo("完成", f"已在所有文件名末尾添加后缀：{suffix}")
-
-def add_current_time(directory):
-    save_original_names(directory)
-    current_time = datetime.datetime.now().strftime("_%Y%m%d%H%M%S")
-    for filename in os.listdir(directory):
-        if os.path.isfile(os.path.join(directory, filename)):
-            base, ext = os.path.splitext(filename)
-            new_name = base + current_time + ext
-            os.rename(os.path.join(directory, filename), os.path.join(directory, new_name))
-    messagebox.showinfo("完成", "已在所有文件名末尾添加当前时间")
-
-def add_prefix(directory, prefix):
-    save_original_names(directory)
-    for filename in os.listdir(directory):
-        if os.path.isfile(os.path.join(directory, filename)):
-            new_name = prefix + filename
-            os.rename(os.path.join(directory, filename), os.path.join(directory, new_name))
-    messagebox.showinfo("完成", f"已在所有文件名前添加前缀：{prefix}")
-
-def undo_changes(directory):
-    if not os.path.exists(backup_file):
-        messagebox.showwarning("警告", "没有备份文件，无法撤回")
+from tkinter import filedialog, messagebox, ttk
+from concurrent.futures import ThreadPoolExecutor
+from rename_engine import (plan_tree, apply_plans, describe_plans, plan_conflicts, suffix_rule, prefix_rule, time_rule,
+                           undo_tree, pending_directories, resume_directories, RENAME_WORKERS)
+
+# 预览和冲突提示中最多列出的条目数
+PREVIEW_LIMIT = 50
+CONFLICT_LIMIT = 20
+
+# 检查后台任务和进度队列的间隔（毫秒）
+POLL_INTERVAL_MS = 50
+
+# 扫描和重命名在后台线程中执行，窗口不会卡住；进度通过队列传回，由 root.after 定时读取
+# 后台线程不直接操作窗口，所有提示框都在任务完成后由主线程弹出
+executor = ThreadPoolExecutor(max_workers=1)
+progress_queue = queue.Queue()
+cancel_event = threading.Event()
+current_job = None
+
+def start_job(name, func, on_done):
+    global current_job
+    cancel_event.clear()
+    job = executor.submit(func)
+    current_job = job
+    status_var.set(f"正在{name}……")
+    progress_bar.config(mode="indeterminate", value=0)
+    progress_bar.start()
+    btn_execute.config(state=tk.DISABLED)
+    btn_cancel.config(state=tk.NORMAL)
+    root.after(POLL_INTERVAL_MS, poll_job, job, name, on_done)
+
+def poll_job(job, name, on_done):
+    show_progress()
+    if not job.done():
+        root.after(POLL_INTERVAL_MS, poll_job, job, name, on_done)
         return
-    
-    with open(backup_file, "r") as f:
-        original_names = f.read().splitlines()
-    
-    for original_name in original_names:
-        for filename in os.listdir(directory):
-            if os.path.isfile(os.path.join(directory, filename)):
-                base, ext = os.path.splitext(filename)
-                if original_name.startswith(base.split('_')[0]):  # Match with the original name base
-                    os.rename(os.path.join(directory, filename), os.path.join(directory, original_name))
-                    break
-    messagebox.showinfo("完成", "已撤回所有文件名修改")
+    finish_job("已取消" if cancel_event.is_set() else "")
+    try:
+        result = job.result()
+    except Exception as e:
+        messagebox.showerror(name, f"{name}失败：{e}")
+        return
+    on_done(result)
+
+# 只显示队列中最新的进度；fraction 为 None 时进度条为不确定模式
+def show_progress():
+    latest = None
+    while True:
+        try:
+            latest = progress_queue.get_nowait()
+        except queue.Empty:
+            break
+    if latest is None:
+        return
+    text, fraction = latest
+    status_var.set(text)
+    if fraction is not None:
+        if str(progress_bar.cget("mode")) != "determinate":
+            progress_bar.stop()
+            progress_bar.config(mode="determinate")
+        progress_bar.config(value=fraction * 100)
+
+def finish_job(status):
+    global current_job
+    current_job = None
+    progress_bar.stop()
+    progress_bar.config(mode="determinate", value=0)
+    btn_execute.config(state=tk.NORMAL)
+    btn_cancel.config(state=tk.DISABLED)
+    status_var.set(status)
+
+# 取消当前任务：正在执行的改名完成后停止，已完成的部分记录在日志中，可以撤回
+def cancel_job():
+    if current_job is not None:
+        cancel_event.set()
+        status_var.set("正在取消……")
+
+# 以下进度回调在后台线程中调用，只向队列放入消息
+def report_scan(scanned):
+    progress_queue.put((f"已扫描 {scanned} 个文件夹", None))
+
+def rename_reporter():
+    start = time.monotonic()
+
+    def report(done, total):
+        rate = done / max(time.monotonic() - start, 1e-9)
+        progress_queue.put((f"已重命名 {done}/{total} 个文件（{rate:.0f} 个/秒）", done / total))
+    return report
+
+# 扫描目录（recursive 时包括所有子目录）生成重命名计划；有冲突时列出冲突并放弃，仅预览时只显示计划
+# 执行时每个目录的每批重命名都在该目录的 .rename_journal 中留下日志，用于撤回和中断后恢复
+def rename_files(directory, rule, done_message, dry_run=False, recursive=False):
+    def planned(plans):
+        if cancel_event.is_set():
+            return
+        conflicts = plan_conflicts(plans, directory)
+        if conflicts:
+            details = '\n'.join(f'{name} -> {new}：{reason}' for name, new, reason in conflicts[:CONFLICT_LIMIT])
+            messagebox.showwarning("文件名冲突", f"有 {len(conflicts)} 个文件名冲突，未执行任何重命名：\n{details}")
+            return
+        if dry_run:
+            messagebox.showinfo("预览", describe_plans(plans, directory, PREVIEW_LIMIT) or "没有需要重命名的文件")
+            return
+        start_job("重命名", lambda: apply_plans(plans, RENAME_WORKERS, rename_reporter(), cancel_event), renamed)
+
+    def renamed(count):
+        if cancel_event.is_set():
+            messagebox.showinfo("已取消", f"已取消，已重命名 {count} 个文件，可以撤回")
+        else:
+            messagebox.showinfo("完成", done_message)
+
+    start_job("扫描", lambda: plan_tree(directory, rule, recursive, report_scan, cancel_event), planned)
+
+def add_suffix(directory, suffix, dry_run=False, recursive=False):
+    rename_files(directory, suffix_rule(suffix), f"已在所有文件名末尾添加后缀：{suffix}", dry_run, recursive)
+
+def add_current_time(directory, dry_run=False, recursive=False):
+    rename_files(directory, time_rule(), "已在所有文件名末尾添加当前时间", dry_run, recursive)
+
+def add_prefix(directory, prefix, dry_run=False, recursive=False):
+    rename_files(directory, prefix_rule(prefix), f"已在所有文件名前添加前缀：{prefix}", dry_run, recursive)
+
+# 撤回最近一批重命名；再次撤回会继续撤回更早的一批。recursive 时各子目录分别撤回
+def undo_changes(directory, recursive=False):
+    def undone(result):
+        count, errors = result
+        if errors:
+            details = '\n'.join(error for _, error in errors[:CONFLICT_LIMIT])
+            messagebox.showwarning("警告", f"有 {len(errors)} 个文件夹无法撤回：\n{details}")
+        if count:
+            messagebox.showinfo("完成", f"已撤回 {count} 个文件的修改")
+        elif not errors:
+            messagebox.showwarning("警告", "没有可撤回的修改")
+
+    start_job("撤回", lambda: undo_tree(directory, recursive, cancel_event), undone)
+
+# 上次重命名在中途中断（如程序崩溃、断电）时，先按日志补做剩下的步骤，再执行 action
+def resume_interrupted(directory, recursive, action):
+    def checked(pending):
+        if cancel_event.is_set():
+            return
+        if not pending:
+            action()
+            return
+        if messagebox.askyesno("未完成的修改", "上次的重命名在中途中断，是否先完成它？"):
+            start_job("恢复", lambda: resume_directories(pending), resumed)
+
+    def resumed(count):
+        messagebox.showinfo("完成", f"已完成上次中断的重命名（补做 {count} 个文件）")
+        action()
+
+    start_job("检查", lambda: pending_directories(directory, recursive, cancel_event), checked)
 
 def select_directory():
     directory = filedialog.askdirectory()
@@ -64,29 +163,36 @@ def select_directory():
         entry_directory.insert(0, directory)
 
 def execute_action():
+    if current_job is not None:
+        messagebox.showinfo("请稍候", "上一个操作还在进行中")
+        return
     directory = entry_directory.get()
     if not directory:
         messagebox.showwarning("警告", "请先选择文件夹路径")
         return
-    
+    dry_run = dry_run_var.get()
+    recursive = recursive_var.get()
+
     if var.get() == 1:
         suffix = entry_suffix.get()
         if not suffix:
             messagebox.showwarning("警告", "请先输入后缀")
             return
-        add_suffix(directory, suffix)
+        action = lambda: add_suffix(directory, suffix, dry_run, recursive)
     elif var.get() == 2:
-        add_current_time(directory)
+        action = lambda: add_current_time(directory, dry_run, recursive)
     elif var.get() == 3:
         prefix = entry_prefix.get()
         if not prefix:
             messagebox.showwarning("警告", "请先输入前缀")
             return
-        add_prefix(directory, prefix)
+        action = lambda: add_prefix(directory, prefix, dry_run, recursive)
     elif var.get() == 4:
-        undo_changes(directory)
+        action = lambda: undo_changes(directory, recursive)
     else:
         messagebox.showwarning("警告", "请选择操作类型")
+        return
+    resume_interrupted(directory, recursive, action)
 
 def update_clock():
     now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -120,13 +226,29 @@ entry_suffix.grid(row=1, column=3, padx=10, pady=5)
 tk.Label(root, text="前缀:").grid(row=3, column=2, padx=10, pady=5, sticky=tk.W)
 entry_prefix.grid(row=3, column=3, padx=10, pady=5)
 
+# 仅预览：只显示重命名计划，不修改文件
+dry_run_var = tk.BooleanVar()
+tk.Checkbutton(root, text="仅预览", variable=dry_run_var).grid(row=4, column=2, padx=10, pady=5, sticky=tk.W)
+
+# 包括子文件夹：递归处理所有子文件夹中的文件
+recursive_var = tk.BooleanVar()
+tk.Checkbutton(root, text="包括子文件夹", variable=recursive_var).grid(row=4, column=3, padx=10, pady=5, sticky=tk.W)
+
 # 执行按钮
 btn_execute = tk.Button(root, text="执行", command=execute_action)
 btn_execute.grid(row=5, column=1, padx=10, pady=10, columnspan=2)
 
+# 进度：状态文字、进度条和取消按钮
+status_var = tk.StringVar()
+tk.Label(root, textvariable=status_var, anchor=tk.W).grid(row=6, column=0, columnspan=2, padx=10, pady=5, sticky=tk.W + tk.E)
+progress_bar = ttk.Progressbar(root, mode="determinate", length=200)
+progress_bar.grid(row=6, column=2, padx=10, pady=5)
+btn_cancel = tk.Button(root, text="取消", command=cancel_job, state=tk.DISABLED)
+btn_cancel.grid(row=6, column=3, padx=10, pady=5)
+
 # 时钟模块
 clock_label = tk.Label(root, font=('times', 20, 'bold'))
-clock_label.grid(row=6, column=0, columnspan=4, pady=10)
+clock_label.grid(row=7, column=0, columnspan=4, pady=10)
 update_clock()
 
 # 运行主循环
@@ -0,0 +1,211 @@
+import os
+import json
+import hashlib
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+import image_ops
+
+# 批量处理时识别的图片扩展名
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif')
+
+# 配方中可用的步骤名称
+STEP_NAMES = ('compress', 'resize', 'thumbnail', 'grayscale', 'blur', 'crop', 'format')
+
+# 输出目录中记录各输出文件由哪个配方生成的清单（相对路径 -> 配方摘要）
+MANIFEST_NAME = '.image_batch.json'
+
+# 解析 "WxH" 形式的尺寸
+def parse_size(text):
+    width, _, height = text.lower().partition('x')
+    return int(width), int(height)
+
+# 解析一个配方步骤，例如 compress:100、compress:100,shrink、resize:800x600、thumbnail:800x600、blur:3、crop:0,0,100,100、format:PNG
+def parse_step(text):
+    name, _, arg = text.partition(':')
+    name = name.strip().lower()
+    if name not in STEP_NAMES:
+        raise ValueError(f"不支持的步骤: {name}（可用: {', '.join(STEP_NAMES)}）")
+    if name == 'compress':
+        size, _, option = arg.partition(',')
+        if option and option != 'shrink':
+            raise ValueError(f"不支持的压缩选项: {option}")
+        return name, (int(size), option == 'shrink')
+    if name in ('resize', 'thumbnail'):
+        return name, parse_size(arg)
+    if name == 'grayscale':
+        return name, ()
+    if name == 'blur':
+        return name, (float(arg),) if arg else ()
+    if name == 'crop':
+        x, y, width, height = (int(value) for value in arg.split(','))
+        return name, (x, y, width, height)
+    format_ = arg.upper()
+    if format_ == 'JPG':
+        format_ = 'JPEG'
+    if format_ not in image_ops.FORMAT_EXTENSIONS:
+        raise ValueError(f"不支持的格式: {arg}")
+    return name, (format_,)
+
+# 配方的输出格式：最后一个 format 步骤决定；没有时 compress 输出 JPEG，否则保持原格式
+def recipe_format(steps):
+    format_ = None
+    for name, args in steps:
+        if name == 'format':
+            format_ = args[0]
+        elif name == 'compress':
+            format_ = 'JPEG'
+    return format_
+
+# 计算输出路径：保持相对目录结构，按输出格式替换扩展名
+def output_path(input_file, input_dir, output_dir, format_):
+    relative = os.path.relpath(input_file, input_dir)
+    if format_:
+        relative = os.path.splitext(relative)[0] + image_ops.FORMAT_EXTENSIONS[format_]
+    return os.path.join(output_dir, relative)
+
+# 递归查找目录中的图片文件
+def find_images(input_dir):
+    images = []
+    for dirpath, dirnames, filenames in os.walk(input_dir):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                images.append(os.path.join(dirpath, filename))
+    return images
+
+# 配方的摘要：步骤或参数不同的配方摘要不同
+def recipe_digest(steps):
+    return hashlib.sha256(json.dumps(steps).encode('utf-8')).hexdigest()
+
+# 读取输出目录中的清单；不存在或已损坏时视为空
+def load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+# 先写临时文件再替换，中途失败不会留下半个清单
+def save_manifest(output_dir, manifest):
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=0, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+# 清单中的键：输出文件相对输出目录的路径
+def manifest_key(output_file, output_dir):
+    return os.path.relpath(output_file, output_dir).replace(os.sep, '/')
+
+# 输出文件存在、不早于输入文件，且清单中记录的配方摘要与本次相同时视为已是最新
+def is_up_to_date(input_file, output_file, digest, recorded_digest):
+    return recorded_digest == digest and os.path.exists(output_file) \
+        and os.path.getmtime(output_file) >= os.path.getmtime(input_file)
+
+# 按顺序对图片应用配方，返回 (图片, 编码好的字节串或 None)
+# compress 是最后一步时直接使用压缩得到的字节串，避免再次编码
+# 进程池已经占满所有核，滤波不再分线程
+def apply_recipe(image, steps):
+    data = None
+    for name, args in steps:
+        data = None
+        if name == 'compress':
+            image, data = image_ops.compress_image(image, *args)
+        elif name == 'resize':
+            image = image_ops.resize_image(image, *args, keep_aspect=False)
+        elif name == 'thumbnail':
+            image = image_ops.resize_image(image, *args, keep_aspect=True)
+        elif name == 'grayscale':
+            image = image_ops.black_and_white(image, workers=1)
+        elif name == 'blur':
+            image = image_ops.gaussian_blur(image, *args, workers=1)
+        elif name == 'crop':
+            image = image_ops.crop_image(image, *args)
+    return image, data
+
+# 处理单个文件（在子进程中运行），返回 (输入路径, 错误信息或 None)
+def process_image(input_file, output_file, steps, format_):
+    try:
+        with Image.open(input_file) as image:
+            image.load()
+            source_format = image.format
+            result, data = apply_recipe(image, steps)
+        format_ = format_ or source_format
+        if data is None or format_ != 'JPEG':
+            data = image_ops.encode_image(result, format_)
+
+        # 先写临时文件再替换，中途失败不会留下被误认为最新的半成品
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        temp_file = output_file + '.tmp'
+        with open(temp_file, 'wb') as f:
+            f.write(data)
+        os.replace(temp_file, output_file)
+        return input_file, None
+    except Exception as e:
+        return input_file, str(e)
+
+# 对目录树中的所有图片并行应用配方，返回 (处理数, 跳过数, 失败列表)
+def process_directory(input_dir, output_dir, steps, workers=None, force=False):
+    format_ = recipe_format(steps)
+    digest = recipe_digest(steps)
+    manifest = load_manifest(output_dir)
+    jobs = []
+    skipped = 0
+    for input_file in find_images(input_dir):
+        output_file = output_path(input_file, input_dir, output_dir, format_)
+        if not force and is_up_to_date(input_file, output_file, digest, manifest.get(manifest_key(output_file, output_dir))):
+            skipped += 1
+            continue
+        jobs.append((input_file, output_file))
+
+    failures = []
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(process_image, input_file, output_file, steps, format_)
+                       for input_file, output_file in jobs]
+            for future, (_, output_file) in zip(futures, jobs):
+                input_file, error = future.result()
+                if error:
+                    logging.error(f"处理 {input_file} 出错: {error}")
+                    failures.append((input_file, error))
+                else:
+                    manifest[manifest_key(output_file, output_dir)] = digest
+        # 只由主进程写清单；失败的文件保留原来的记录，与磁盘上的旧输出一致
+        save_manifest(output_dir, manifest)
+    return len(jobs) - len(failures), skipped, failures
+
+# 主函数
+def main():
+    parser = argparse.ArgumentParser(description='按配方批量处理目录中的图片。')
+    parser.add_argument('--input', type=str, required=True, help='输入目录（递归处理子目录）')
+    parser.add_argument('--output', type=str, required=True, help='输出目录（保持相对目录结构）')
+    parser.add_argument('--step', type=str, action='append', required=True,
+                        help='按顺序执行的步骤，可多次指定：compress:KB[,shrink]（shrink: 必要时缩小尺寸）、resize:WxH、thumbnail:WxH（锁定纵横比）、'
+                             'grayscale、blur[:半径]、crop:x,y,宽,高、format:JPEG|PNG|BMP|GIF')
+    parser.add_argument('--workers', type=int, default=None, help='并行进程数（默认: CPU 核数）')
+    parser.add_argument('--force', action='store_true', help='重新处理已是最新的输出文件')
+
+    args = parser.parse_args()
+    if args.workers is not None and args.workers < 1:
+        parser.error(f'--workers 必须为正整数: {args.workers}')
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if not os.path.isdir(args.input):
+        logging.error(f'输入目录 {args.input} 不存在')
+        return
+    try:
+        steps = [parse_step(step) for step in args.step]
+    except ValueError as e:
+        logging.error(f"配方无效: {e}")
+        return
+
+    processed, skipped, failures = process_directory(args.input, args.output, steps, args.workers, args.force)
+    logging.info(f'已处理 {processed} 个文件，跳过 {skipped} 个已是最新的文件，失败 {len(failures)} 个')
+
+if __name__ == "__main__":
+    main()
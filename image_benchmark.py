@@ -0,0 +1,114 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+import platform
+
+import numpy as np
+from PIL import Image, features
+
+import image_ops
+import image_edits
+from benchmark_utils import DEFAULT_THRESHOLD, find_regressions, measure
+
+# 默认测试的分辨率和图片模式（P 为 256 色调色板，以 GIF 文件读写）
+DEFAULT_SIZES = ['640x480', '1920x1080', '4000x3000']
+DEFAULT_MODES = ['RGB', 'RGBA', 'L', 'P']
+
+# 预览尺寸，与 picture_control.PREVIEW_SIZE 一致
+PREVIEW_SIZE = (400, 400)
+
+# 各模式的图片保存为哪种格式，用于测试从文件生成预览
+MODE_FORMATS = {'RGB': 'JPEG', 'L': 'JPEG', 'RGBA': 'PNG', 'P': 'GIF'}
+
+# 生成合成图片：平滑渐变叠加噪声，压缩难度接近真实照片
+def generate_image(mode, width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width)[None, :]
+    y = np.linspace(0, 255, height)[:, None]
+    channels = [x + 0 * y, y + 0 * x, (x + y) / 2, 255 - (x + 0 * y) / 2]
+    pixels = np.dstack([channel + rng.normal(0, 12, (height, width)) for channel in channels])
+    image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), 'RGBA')
+    if mode == 'P':
+        return image.convert('RGB').quantize(256)
+    return image.convert(mode)
+
+# 对一张图片的各项操作计时
+def bench_image(workdir, mode, width, height, repeat, compress_kb):
+    image = generate_image(mode, width, height)
+    format_ = MODE_FORMATS[mode]
+    path = os.path.join(workdir, f'{mode}_{width}x{height}{image_ops.FORMAT_EXTENSIONS[format_]}')
+    image.save(path, format=format_)
+
+    timings = {}
+    timings['compress_image'], _ = measure(lambda: image_ops.compress_image(image, compress_kb), repeat)
+    timings['resize_image'], _ = measure(lambda: image_ops.resize_image(image, width // 2, height // 2, keep_aspect=False), repeat)
+    timings['thumbnail'], _ = measure(lambda: image_ops.resize_image(image, 800, 600), repeat)
+    timings['crop_image'], _ = measure(lambda: image_ops.crop_image(image, width // 4, height // 4, width // 2, height // 2), repeat)
+    timings['gaussian_blur'], _ = measure(lambda: image_ops.gaussian_blur(image), repeat)
+    timings['black_and_white'], _ = measure(lambda: image_ops.black_and_white(image), repeat)
+    for target in ('JPEG', 'PNG'):
+        timings[f'convert_format_{target.lower()}'], _ = measure(lambda: image_ops.encode_image(image, target), repeat)
+    timings['load_preview'], _ = measure(lambda: image_edits.load_preview(path, PREVIEW_SIZE), repeat)
+
+    # 编辑栈的预览：每次新建编辑栈，避免只测到缓存命中
+    proxy = image_edits.load_preview(path, PREVIEW_SIZE)
+    steps = (('crop', (width // 4, height // 4, width // 2, height // 2)), ('blur', ()), ('grayscale', ()))
+    timings['edit_preview'], _ = measure(
+        lambda: image_edits.EditStack(image, proxy, PREVIEW_SIZE).preview(steps), repeat)
+    return timings
+
+# 运行全部基准测试
+def run_benchmarks(sizes=DEFAULT_SIZES, modes=DEFAULT_MODES, repeat=3, compress_kb=100):
+    timings = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            width, _, height = size.lower().partition('x')
+            for mode in modes:
+                for operation, seconds in bench_image(workdir, mode, int(width), int(height), repeat, compress_kb).items():
+                    timings[f'{mode}.{size}.{operation}'] = seconds
+    return {
+        'sizes': list(sizes),
+        'modes': list(modes),
+        'pillow': Image.__version__,
+        'libjpeg_turbo': features.check_feature('libjpeg_turbo'),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'timings': timings,
+    }
+
+# 主函数
+def main():
+    parser = argparse.ArgumentParser(description='图片处理性能基准测试（无需显示器）。')
+    parser.add_argument('--sizes', type=str, nargs='+', default=DEFAULT_SIZES, help='测试的分辨率（默认: 640x480 1920x1080 4000x3000）')
+    parser.add_argument('--modes', type=str, nargs='+', default=DEFAULT_MODES, choices=DEFAULT_MODES, help='测试的图片模式（默认: RGB RGBA L P）')
+    parser.add_argument('--repeat', type=int, default=3, help='每项操作的重复次数，取最短时间（默认: 3）')
+    parser.add_argument('--compress-kb', type=int, default=100, help='压缩测试的目标大小（KB，默认: 100）')
+    parser.add_argument('--output', type=str, default=None, help='将结果保存为 JSON 文件')
+    parser.add_argument('--baseline', type=str, default=None, help='基线 JSON 文件；有操作超过阈值时以非零状态退出')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='回归阈值（默认: 0.2，即慢 20%%）')
+
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.modes, args.repeat, args.compress_kb)
+
+    for name, seconds in results['timings'].items():
+        print(f'{name:40s} {seconds * 1000:10.1f} ms')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.threshold)
+        for name, base, seconds in regressions:
+            print(f'性能回归: {name} {base * 1000:.1f} ms -> {seconds * 1000:.1f} ms')
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import math
+from collections import OrderedDict
+from PIL import Image
+import image_ops
+
+# 几何步骤：连续出现时合并为一次重采样
+GEOMETRY_STEPS = ('crop', 'resize', 'thumbnail')
+
+# 缓存的中间结果数量：预览尺寸的结果很小，可以多缓存；原图尺寸只保留最近的几个
+PREVIEW_CACHE_SIZE = 64
+FULL_CACHE_SIZE = 2
+
+# 超过这个像素数的原图分辨率中间结果不缓存，避免超大图片占用成倍的内存
+FULL_CACHE_MAX_PIXELS = 25_000_000
+
+# 按比例缩放 size，使其恰好放入 bounds
+def fit_size(size, bounds):
+    scale = min(bounds[0] / size[0], bounds[1] / size[1])
+    return max(1, round(size[0] * scale)), max(1, round(size[1] * scale))
+
+# 生成预览图：按比例缩放到恰好放入 size（不复制原图）
+def make_preview(image, size):
+    return image.resize(fit_size(image.size, size), Image.LANCZOS, reducing_gap=2.0)
+
+# 读取文件生成预览图；JPEG 按预览尺寸的两倍缩小解码，不需要解码整张原图
+def load_preview(path, size):
+    return make_preview(image_ops.open_scaled(path, (size[0] * 2, size[1] * 2)), size)
+
+# 把一串几何步骤合并为 (输入图中的区域, 输出尺寸)；区域为浮点坐标，可能超出输入图范围
+def fuse_geometry(steps, size):
+    x0, y0, x1, y1 = 0.0, 0.0, float(size[0]), float(size[1])
+    width, height = size
+    for name, args in steps:
+        if name == 'crop':
+            x, y, crop_width, crop_height = args
+            scale_x, scale_y = (x1 - x0) / width, (y1 - y0) / height
+            x0, y0, x1, y1 = (x0 + x * scale_x, y0 + y * scale_y,
+                              x0 + (x + crop_width) * scale_x, y0 + (y + crop_height) * scale_y)
+            width, height = crop_width, crop_height
+        elif name == 'resize':
+            width, height = args
+        elif width > args[0] or height > args[1]:
+            # thumbnail：锁定纵横比，只缩小不放大
+            width, height = fit_size((width, height), args)
+    return (x0, y0, x1, y1), (width, height)
+
+# 将 image 中的区域 box 一次重采样为 size
+def resample(image, box, size):
+    if box == (0, 0, image.width, image.height) and size == image.size:
+        return image
+    if all(float(value).is_integer() for value in box):
+        box = tuple(int(value) for value in box)
+        if size == (box[2] - box[0], box[3] - box[1]):
+            return image.crop(box)
+    if box[0] < 0 or box[1] < 0 or box[2] > image.width or box[3] > image.height:
+        # 超出范围的区域按 crop 的规则补黑边后再缩放
+        return image.crop(tuple(round(value) for value in box)).resize(size, Image.BICUBIC, reducing_gap=2.0)
+    return image.resize(size, Image.BICUBIC, box=box, reducing_gap=2.0)
+
+# 把步骤列表分为若干阶段：连续的几何步骤合并为一个阶段，其余步骤各自为一个阶段
+# 返回 [(阶段结束位置, 是否几何阶段, 步骤列表)]
+def compile_stages(steps):
+    stages = []
+    for end, step in enumerate(steps, 1):
+        geometry = step[0] in GEOMETRY_STEPS
+        if geometry and stages and stages[-1][1]:
+            stages[-1] = (end, True, stages[-1][2] + [step])
+        else:
+            stages.append((end, geometry, [step]))
+    return stages
+
+# 在原图分辨率上执行一个非几何步骤
+def apply_step(image, step):
+    name, args = step
+    if name == 'compress':
+        return image_ops.compress_image(image, *args)[0]
+    if name == 'grayscale':
+        return image_ops.black_and_white(image)
+    if name == 'blur':
+        return image_ops.gaussian_blur(image, *args)
+    if name == 'format':
+        return image_ops.prepare_for_format(image, *args)
+    raise ValueError(f"不支持的步骤: {name}")
+
+# 从 box 重采样出 size 所需的最低解码分辨率（相对于整张原图）
+def required_size(image_size, box, size):
+    return tuple(max(1, math.ceil(image_size[i] * size[i] / max(1e-9, box[i + 2] - box[i]))) for i in (0, 1))
+
+# 按解码后的实际尺寸换算区域坐标
+def scale_box(box, scale_x, scale_y):
+    return box[0] * scale_x, box[1] * scale_y, box[2] * scale_x, box[3] * scale_y
+
+# 非破坏性的编辑栈：只记录步骤（参数以原图像素为单位），需要时才计算
+# 预览在缩小的代理图上计算，原图分辨率只在保存时计算一次；各阶段的结果按步骤内容缓存，撤销/重做无需重算
+# 给出 path 时 image 只需是读取了文件头的图片，计算时按需要的分辨率重新解码（JPEG 可缩小解码）
+class EditStack:
+    def __init__(self, image, proxy, preview_size, path=None):
+        self.image = image
+        self.proxy = proxy
+        self.preview_size = preview_size
+        self.path = path
+        self.steps = []
+        self.redo_steps = []
+        self.cache = {True: OrderedDict(), False: OrderedDict()}
+
+    def push(self, step):
+        self.steps.append(step)
+        self.redo_steps.clear()
+
+    def undo(self):
+        if not self.steps:
+            return False
+        self.redo_steps.append(self.steps.pop())
+        return True
+
+    def redo(self):
+        if not self.redo_steps:
+            return False
+        self.steps.append(self.redo_steps.pop())
+        return True
+
+    # 当前步骤的快照，可交给后台线程计算
+    def snapshot(self):
+        return tuple(self.steps)
+
+    def preview(self, steps=None):
+        return self.evaluate(self.snapshot() if steps is None else steps, preview=True)
+
+    def render(self, steps=None):
+        return self.evaluate(self.snapshot() if steps is None else steps, preview=False)
+
+    # 以不低于 size 的分辨率解码原图
+    def decode(self, size, mode=None):
+        if self.path is None:
+            return self.image
+        return image_ops.open_scaled(self.path, size, mode)
+
+    # 保存时解码原图：第一个阶段是缩小时按缩小后的分辨率解码；先黑白化时直接解码为灰度
+    def decode_source(self, stages):
+        size, mode = self.image.size, None
+        if stages and stages[0][1]:
+            box, output_size = fuse_geometry(stages[0][2], self.image.size)
+            size = required_size(self.image.size, box, output_size)
+        effects = [group[0][0] for _, geometry, group in stages if not geometry]
+        if effects and effects[0] == 'grayscale':
+            mode = 'L'
+        return self.decode(size, mode)
+
+    # 计算 steps 的结果：从已缓存的最长阶段前缀开始，逐阶段计算并缓存
+    # 状态为 (当前图片, 对应的原图分辨率尺寸)；预览或缩小解码时二者不同，几何参数按比例换算
+    def evaluate(self, steps, preview):
+        cache = self.cache[preview]
+        stages = compile_stages(steps)
+        state = None
+        first = 0
+        for i in range(len(stages), 0, -1):
+            key = steps[:stages[i - 1][0]]
+            if key in cache:
+                cache.move_to_end(key)
+                state = cache[key]
+                first = i
+                break
+        if state is None:
+            state = (self.proxy if preview else self.decode_source(stages), self.image.size)
+
+        for i in range(first, len(stages)):
+            end, geometry, group = stages[i]
+            state = self.run_stage(state, geometry, group, i == 0, preview)
+            if preview or state[0].width * state[0].height <= FULL_CACHE_MAX_PIXELS:
+                cache[steps[:end]] = state
+                if len(cache) > (PREVIEW_CACHE_SIZE if preview else FULL_CACHE_SIZE):
+                    cache.popitem(last=False)
+        return state[0]
+
+    # 执行一个阶段；预览时几何阶段的输出缩放到预览尺寸以内，压缩和格式转换保持不变
+    def run_stage(self, state, geometry, group, first, preview):
+        image, size = state
+        scale_x, scale_y = image.width / size[0], image.height / size[1]
+        if geometry:
+            box, size = fuse_geometry(group, size)
+            output_size = fit_size(size, self.preview_size) if preview else size
+            scaled_box = scale_box(box, scale_x, scale_y)
+            # 预览的第一个阶段若代理图分辨率不足（如裁切出小区域），改从原图按需要的分辨率解码
+            if preview and first and scaled_box[2] - scaled_box[0] < output_size[0]:
+                image = self.decode(required_size(self.image.size, box, output_size))
+                scaled_box = scale_box(box, image.width / self.image.width, image.height / self.image.height)
+            return resample(image, scaled_box, output_size), size
+
+        name, args = group[0]
+        if name == 'blur':
+            radius = args[0] if args else image_ops.DEFAULT_BLUR_RADIUS
+            return image_ops.gaussian_blur(image, radius * scale_x), size
+        if preview:
+            if name in ('compress', 'format'):
+                # 压缩效果和格式转换取决于原图分辨率，预览中保持不变
+                return image, size
+            return apply_step(image, group[0]), size
+        image = apply_step(image, group[0])
+        return image, image.size
@@ -0,0 +1,131 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageFilter
+
+# 支持的输出格式及其扩展名
+FORMAT_EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'BMP': '.bmp', 'GIF': '.gif'}
+
+# 默认高斯模糊半径
+DEFAULT_BLUR_RADIUS = 5
+
+# 分块处理时每个水平条带的行数
+TILE_ROWS = 512
+
+# 分块滤波默认使用的线程数（Pillow 的滤波在 C 代码中执行，不受 GIL 限制）
+FILTER_WORKERS = os.cpu_count() or 1
+
+# 以不低于 size 的分辨率打开图片：JPEG 用 draft 模式在解码时直接缩小到 1/2、1/4 或 1/8，
+# 并可直接解码为灰度（mode='L'）；其他格式不支持，仍按原尺寸解码
+def open_scaled(path, size, mode=None):
+    image = Image.open(path)
+    if mode and image.mode not in ('RGB', 'YCbCr', 'L'):
+        mode = None
+    image.draft(mode, size)
+    return image
+
+# 按水平条带处理图片：每个条带上下各多取 margin 行作为滤波的边界，处理后只保留中间部分
+# 条带在线程池中并行处理，按顺序拼接；同时在内存中的只有正在处理的几个条带
+def tiled_filter(image, func, margin=0, tile_rows=TILE_ROWS, workers=None):
+    if image.height <= tile_rows:
+        return func(image)
+    # 多个线程同时裁切前必须先完成解码
+    image.load()
+
+    def run(top):
+        bottom = min(top + tile_rows, image.height)
+        strip_top = max(0, top - margin)
+        strip = func(image.crop((0, strip_top, image.width, min(image.height, bottom + margin))))
+        return top, strip.crop((0, top - strip_top, image.width, bottom - strip_top))
+
+    output = None
+    with ThreadPoolExecutor(max_workers=workers or FILTER_WORKERS) as executor:
+        for top, strip in executor.map(run, range(0, image.height, tile_rows)):
+            if output is None:
+                output = Image.new(strip.mode, image.size)
+            output.paste(strip, (0, top))
+    return output
+
+# 不支持透明通道或调色板的格式需要先转换为 RGB
+def prepare_for_format(image, format_):
+    if format_ in ('JPEG', 'BMP') and image.mode not in ('RGB', 'L'):
+        return image.convert('RGB')
+    return image
+
+# 将图片编码为指定格式的字节串
+def encode_image(image, format_, **params):
+    buffer = io.BytesIO()
+    prepare_for_format(image, format_).save(buffer, format=format_, **params)
+    return buffer.getvalue()
+
+# JPEG 压缩质量的搜索范围
+MIN_QUALITY = 10
+MAX_QUALITY = 95
+
+# JPEG 色度子采样：2 表示 4:2:0（Pillow 的默认值），色度分辨率减半
+CHROMA_SUBSAMPLING = 2
+
+# 缩小尺寸回退时的最小边长
+MIN_DIMENSION = 16
+
+# 以 JPEG 编码图片
+def encode_jpeg(image, quality):
+    return encode_image(image, 'JPEG', quality=quality, subsampling=CHROMA_SUBSAMPLING)
+
+# 二分查找不超过字节数上限的最高质量，返回 (质量, 字节串)；最低质量仍超限时质量为 None
+def search_quality(image, max_size_bytes):
+    data = encode_jpeg(image, MAX_QUALITY)
+    if len(data) <= max_size_bytes:
+        return MAX_QUALITY, data
+    best = None
+    low, high = MIN_QUALITY, MAX_QUALITY - 1
+    while low <= high:
+        quality = (low + high) // 2
+        candidate = encode_jpeg(image, quality)
+        if len(candidate) <= max_size_bytes:
+            best = quality, candidate
+            low = quality + 1
+        else:
+            data = candidate
+            high = quality - 1
+    return best or (None, data)
+
+# 压缩图片到指定大小（KB）以下，返回 (压缩后的图片, JPEG 字节串)
+# 只调质量无法满足时，shrink=True 会按超出比例逐步缩小尺寸；否则返回最低质量的结果
+def compress_image(image, max_size_kb, shrink=False):
+    max_size_bytes = max_size_kb * 1024
+    quality, data = search_quality(image, max_size_bytes)
+
+    candidate = image
+    while quality is None and shrink and min(candidate.size) > MIN_DIMENSION:
+        # 文件大小约与像素数成正比，按面积比例估算缩放系数，并多缩小一点避免反复尝试
+        scale = min(0.9, (max_size_bytes / len(data)) ** 0.5 * 0.95)
+        size = tuple(max(MIN_DIMENSION, int(side * scale)) for side in candidate.size)
+        candidate = image.resize(size, Image.LANCZOS)
+        quality, data = search_quality(candidate, max_size_bytes)
+
+    return Image.open(io.BytesIO(data)), data
+
+# 黑白化
+def black_and_white(image, workers=None):
+    return tiled_filter(image, lambda strip: strip.convert("L"), workers=workers)
+
+# 高斯模糊；调色板图片（如 GIF）不能直接滤波，先转换为 RGBA
+def gaussian_blur(image, radius=DEFAULT_BLUR_RADIUS, workers=None):
+    if image.mode in ('P', '1'):
+        image = image.convert('RGBA')
+    # 高斯核在约 3 倍半径处可以忽略，条带之间重叠这么多行即可无缝拼接
+    margin = int(radius * 3) + 2
+    return tiled_filter(image, lambda strip: strip.filter(ImageFilter.GaussianBlur(radius)), margin, workers=workers)
+
+# 裁切
+def crop_image(image, x, y, width, height):
+    return image.crop((x, y, x + width, y + height))
+
+# 改变尺寸；锁定纵横比时按比例缩小到不超过给定尺寸（不修改原图）
+def resize_image(image, width, height, keep_aspect=True):
+    if keep_aspect:
+        resized_image = image.copy()
+        resized_image.thumbnail((width, height))
+        return resized_image
+    return image.resize((width, height))
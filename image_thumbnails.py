@@ -0,0 +1,154 @@
+import io
+import os
+import shutil
+import hashlib
+import tempfile
+import threading
+from PIL import Image
+
+# 缩略图缓存默认的大小上限（字节）
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# 超过上限时淘汰到上限的这个比例，避免每写一个条目都要淘汰一次
+EVICT_RATIO = 0.9
+
+# 缩略图文件与文件摘要索引的扩展名
+THUMBNAIL_SUFFIX = '.thumb'
+INDEX_SUFFIX = '.digest'
+CACHE_SUFFIXES = (THUMBNAIL_SUFFIX, INDEX_SUFFIX)
+
+# 计算文件内容的 SHA-256 摘要
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# 默认缓存目录：Windows 为 %LOCALAPPDATA%，其他系统为 $XDG_CACHE_HOME 或 ~/.cache
+def default_thumbnail_dir():
+    base = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'picture_control', 'thumbnails')
+
+# 以文件内容摘要和缩略图尺寸为键的磁盘缩略图缓存，总大小超过上限时按最近使用时间淘汰
+# 文件路径、修改时间和大小到内容摘要的映射也记录在缓存中，未修改的文件不必重新计算摘要
+# 可在多个线程中同时使用
+class ThumbnailCache:
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or default_thumbnail_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.total_bytes = sum(size for _, size, _ in self.scan())
+
+    def path(self, key, suffix):
+        return os.path.join(self.cache_dir, key + suffix)
+
+    # 文件内容摘要；路径、修改时间和大小都未变时直接读取记录的摘要
+    def content_digest(self, image_path):
+        stat = os.stat(image_path)
+        stat_key = hashlib.sha256(f'{os.path.abspath(image_path)}\0{stat.st_mtime_ns}\0{stat.st_size}'.encode('utf-8')).hexdigest()
+        index_path = self.path(stat_key, INDEX_SUFFIX)
+        try:
+            with open(index_path, encoding='ascii') as f:
+                digest = f.read()
+            os.utime(index_path)
+            return digest
+        except OSError:
+            pass
+        digest = file_digest(image_path)
+        with self.lock:
+            self.write(index_path, digest.encode('ascii'))
+            self.total_bytes += len(digest)
+        return digest
+
+    def key(self, image_path, size):
+        return f'{self.content_digest(image_path)}_{size[0]}x{size[1]}'
+
+    def get(self, image_path, size):
+        thumbnail_path = self.path(self.key(image_path, size), THUMBNAIL_SUFFIX)
+        try:
+            with Image.open(thumbnail_path) as image:
+                image.load()
+            # 更新修改时间作为最近使用时间
+            os.utime(thumbnail_path)
+        except (OSError, ValueError):
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return image
+
+    def put(self, image_path, size, image):
+        buffer = io.BytesIO()
+        # CMYK、I;16 等 JPEG 和 PNG 都不一定支持的模式先转换为 RGB（带透明通道的转换为 RGBA）
+        if image.mode not in ('RGB', 'L', 'RGBA', 'P'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        # 不透明图片存为 JPEG，带透明通道或调色板的存为 PNG
+        if image.mode in ('RGB', 'L'):
+            image.save(buffer, format='JPEG', quality=90)
+        else:
+            image.save(buffer, format='PNG')
+        data = buffer.getvalue()
+        thumbnail_path = self.path(self.key(image_path, size), THUMBNAIL_SUFFIX)
+        with self.lock:
+            try:
+                self.total_bytes -= os.path.getsize(thumbnail_path)
+            except OSError:
+                pass
+            self.write(thumbnail_path, data)
+            self.total_bytes += len(data)
+            if self.total_bytes > self.max_bytes:
+                self.evict()
+
+    # 取缓存中的缩略图，没有时调用 make(image_path) 生成并写入缓存；写入缓存失败时仍返回生成的缩略图
+    def thumbnail(self, image_path, size, make):
+        image = self.get(image_path, size)
+        if image is None:
+            image = make(image_path)
+            try:
+                self.put(image_path, size, image)
+            except OSError:
+                pass
+        return image
+
+    def write(self, path, data):
+        # 先写临时文件再原子替换，多个线程同时写同一条目也不会读到半个文件
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    # 列出缓存条目 [(修改时间, 大小, 路径)]；扫描期间被删除的文件（其他进程淘汰或用户清理）直接跳过
+    def scan(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(CACHE_SUFFIXES):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    # 按最近使用时间从旧到新删除缩略图和摘要记录，直到总大小降到上限的 EVICT_RATIO 以下
+    def evict(self):
+        entries = sorted(self.scan())
+        self.total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self.total_bytes <= self.max_bytes * EVICT_RATIO:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.total_bytes -= size
+
+    def clear(self):
+        with self.lock:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self.total_bytes = 0
@@ -1,8 +1,32 @@
+import os
+import queue
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from tkinter import ttk
-from PIL import Image, ImageTk, ImageFilter, ImageOps
-import os
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageTk
+import image_ops
+from image_batch import IMAGE_EXTENSIONS
+import image_edits
+from image_edits import EditStack, fit_size
+from image_thumbnails import ThumbnailCache
+
+# 预览图（画布）尺寸
+PREVIEW_SIZE = (400, 400)
+
+# 检查后台任务是否完成的间隔（毫秒）
+POLL_INTERVAL_MS = 50
+
+# 浏览文件夹时每个缩略图的显示尺寸和每行个数
+TILE_SIZE = (128, 128)
+BROWSE_COLUMNS = 5
+
+# 允许打开的最大像素数：Pillow 默认约 9000 万像素，超过两倍即拒绝打开，不够处理大幅扫描件
+Image.MAX_IMAGE_PIXELS = 1_000_000_000
+
+# 读取文件生成预览代理图（缩略图缓存未命中时调用）
+def load_preview(path):
+    return image_edits.load_preview(path, PREVIEW_SIZE)
 
 class ImageEditor:
     def __init__(self, root):
@@ -14,12 +38,22 @@ class ImageEditor:
         self.image = None
         self.image_path = None
         self.preview_image = None
+        # 编辑栈：记录所有操作，预览在原图的缩小副本上计算，保存时才处理原图
+        self.edits = None
+
+        # 原图分辨率的处理在单个后台线程中依次执行，结果通过 after() 交回 Tk 主循环
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.job = None
+        self.saving = False
+
+        # 磁盘缩略图缓存：按文件内容缓存预览代理图，再次打开同一图片无需解码原图
+        self.thumbnails = ThumbnailCache()
 
         # 创建GUI元素
         self.create_widgets()
 
     def create_widgets(self):
-        self.canvas = tk.Canvas(self.root, width=400, height=400)
+        self.canvas = tk.Canvas(self.root, width=PREVIEW_SIZE[0], height=PREVIEW_SIZE[1])
         self.canvas.pack(side=tk.LEFT, padx=10, pady=10)
 
         self.control_frame = tk.Frame(self.root)
@@ -28,9 +62,21 @@ class ImageEditor:
         self.load_button = tk.Button(self.control_frame, text="加载图片", command=self.load_image)
         self.load_button.pack(pady=5)
 
+        self.browse_button = tk.Button(self.control_frame, text="浏览文件夹", command=self.browse_folder)
+        self.browse_button.pack(pady=5)
+
         self.save_button = tk.Button(self.control_frame, text="保存图片", command=self.save_image)
         self.save_button.pack(pady=5)
 
+        self.history_frame = tk.Frame(self.control_frame)
+        self.history_frame.pack(pady=5)
+
+        self.undo_button = tk.Button(self.history_frame, text="撤销", command=self.undo)
+        self.undo_button.pack(side=tk.LEFT, padx=5)
+
+        self.redo_button = tk.Button(self.history_frame, text="重做", command=self.redo)
+        self.redo_button.pack(side=tk.LEFT, padx=5)
+
         self.compression_frame = tk.LabelFrame(self.control_frame, text="压缩图片")
         self.compression_frame.pack(fill=tk.X, padx=5, pady=5)
 
@@ -38,6 +84,10 @@ class ImageEditor:
         self.size_entry.pack(side=tk.LEFT, padx=5)
         self.size_entry.insert(0, "100")  # 默认100KB以下
 
+        self.shrink_var = tk.BooleanVar()
+        self.shrink_check = tk.Checkbutton(self.compression_frame, text="允许缩小尺寸", variable=self.shrink_var)
+        self.shrink_check.pack(side=tk.LEFT, padx=5)
+
         self.compress_button = tk.Button(self.compression_frame, text="压缩", command=self.compress_image)
         self.compress_button.pack(side=tk.LEFT, padx=5)
 
@@ -47,6 +97,10 @@ class ImageEditor:
         self.bw_button = tk.Button(self.effects_frame, text="黑白化", command=self.black_and_white)
         self.bw_button.pack(side=tk.LEFT, padx=5, pady=5)
 
+        self.blur_radius_entry = tk.Entry(self.effects_frame, width=5)
+        self.blur_radius_entry.pack(side=tk.LEFT, padx=5)
+        self.blur_radius_entry.insert(0, str(image_ops.DEFAULT_BLUR_RADIUS))
+
         self.gaussian_blur_button = tk.Button(self.effects_frame, text="高斯模糊", command=self.gaussian_blur)
         self.gaussian_blur_button.pack(side=tk.LEFT, padx=5, pady=5)
 
@@ -103,84 +157,253 @@ class ImageEditor:
         self.convert_button = tk.Button(self.format_frame, text="转换", command=self.convert_format)
         self.convert_button.pack(side=tk.LEFT, padx=5, pady=5)
 
+        self.status_frame = tk.Frame(self.control_frame)
+        self.status_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        self.status_var = tk.StringVar()
+        self.status_label = tk.Label(self.status_frame, textvariable=self.status_var)
+        self.status_label.pack(side=tk.LEFT, padx=5)
+
+        self.progress = ttk.Progressbar(self.status_frame, mode="indeterminate", length=120)
+        self.progress.pack(side=tk.LEFT, padx=5)
+
+        self.cancel_button = tk.Button(self.status_frame, text="取消", command=self.cancel_job, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+
+    # 在后台线程中执行 func，完成后在主线程中以其返回值调用 on_done
+    def start_job(self, name, func, on_done):
+        if self.job:
+            self.job.cancel()
+        job = self.executor.submit(func)
+        self.job = job
+        self.status_var.set(f"正在处理：{name}")
+        self.progress.start()
+        self.cancel_button.config(state=tk.NORMAL)
+        self.root.after(POLL_INTERVAL_MS, self.poll_job, job, name, on_done)
+
+    def poll_job(self, job, name, on_done):
+        # 已被取消或被新的操作替代的任务，结果直接丢弃
+        if job is not self.job:
+            return
+        if not job.done():
+            self.root.after(POLL_INTERVAL_MS, self.poll_job, job, name, on_done)
+            return
+        self.finish_job("")
+        try:
+            result = job.result()
+        except Exception as e:
+            messagebox.showerror(name, f"处理失败：{e}")
+            return
+        on_done(result)
+
+    def finish_job(self, status):
+        self.job = None
+        self.saving = False
+        self.progress.stop()
+        self.cancel_button.config(state=tk.DISABLED)
+        self.status_var.set(status)
+
+    # 取消当前任务：尚未开始的任务直接取消，正在运行的任务结果会被丢弃
+    def cancel_job(self):
+        if self.job:
+            self.job.cancel()
+            self.finish_job("已取消")
+
+    # 保存进行中时不接受新的操作，避免新任务顶替保存任务
+    def saving_in_progress(self):
+        if self.saving:
+            messagebox.showinfo("请稍候", "图片正在保存，请稍候。")
+        return self.saving
+
     def load_image(self):
-        self.image_path = filedialog.askopenfilename(filetypes=[("Image files", "*.jpg *.jpeg *.png *.bmp *.gif")])
-        if self.image_path:
-            self.image = Image.open(self.image_path)
-            self.display_image(self.image)
+        if self.saving_in_progress():
+            return
+        image_path = filedialog.askopenfilename(filetypes=[("Image files", "*.jpg *.jpeg *.png *.bmp *.gif")])
+        if image_path:
+            self.open_image(image_path)
+
+    def open_image(self, image_path):
+        if not self.saving_in_progress():
+            def load():
+                # 原图只读取文件头，保存时才按需要的分辨率解码
+                return Image.open(image_path), self.thumbnails.thumbnail(image_path, PREVIEW_SIZE, load_preview)
+
+            def loaded(result):
+                self.image_path = image_path
+                self.image, proxy = result
+                self.edits = EditStack(self.image, proxy, PREVIEW_SIZE, image_path)
+                self.display_image(proxy)
+
+            self.start_job("加载图片", load, loaded)
+
+    def browse_folder(self):
+        folder = filedialog.askdirectory()
+        if folder:
+            ThumbnailBrowser(self, folder)
+
+    # 在后台按当前编辑栈计算原图分辨率的结果并保存
+    def save_result(self, name, save_path, format_=None, message="图片已保存成功！"):
+        edits = self.edits
+        steps = edits.snapshot()
+
+        def save():
+            image = edits.render(steps)
+            if format_:
+                image_ops.prepare_for_format(image, format_).save(save_path, format=format_)
+            else:
+                image.save(save_path)
+
+        self.start_job(name, save, lambda _: messagebox.showinfo(name, message))
+        self.saving = True
 
     def save_image(self):
-        if self.preview_image:
+        if self.edits and not self.saving_in_progress():
             save_path = filedialog.asksaveasfilename(defaultextension=".png",
                                                      filetypes=[("PNG files", "*.png"), ("JPEG files", "*.jpg *.jpeg"),
                                                                 ("BMP files", "*.bmp"), ("GIF files", "*.gif")])
             if save_path:
-                self.preview_image.save(save_path)
-                messagebox.showinfo("保存图片", "图片已保存成功！")
+                self.save_result("保存图片", save_path)
 
+    # 显示预览图；传入的应是预览尺寸的图片，不再对原图做缩放
     def display_image(self, image):
         self.preview_image = image
-        img = ImageTk.PhotoImage(image.resize((400, 400), Image.LANCZOS))
+        img = ImageTk.PhotoImage(image)
+        self.canvas.delete("all")
         self.canvas.create_image(0, 0, anchor=tk.NW, image=img)
         self.canvas.image = img
 
-    def compress_image(self):
-        if self.image:
-            max_size_kb = int(self.size_entry.get())
-            max_size_bytes = max_size_kb * 1024
-            quality = 95
+    # 在后台计算当前编辑栈的预览并显示
+    def refresh_preview(self, name):
+        edits = self.edits
+        steps = edits.snapshot()
+        self.start_job(name, lambda: edits.preview(steps), self.display_image)
+
+    # 记录一个操作（参数以当前结果的像素为单位）并刷新预览
+    def apply_effect(self, name, step):
+        if self.saving_in_progress():
+            return
+        self.edits.push(step)
+        self.refresh_preview(name)
+
+    def undo(self):
+        if self.edits and not self.saving_in_progress() and self.edits.undo():
+            self.refresh_preview("撤销")
 
-            while True:
-                with open("temp.jpg", "wb") as temp_file:
-                    self.image.save(temp_file, format="JPEG", quality=quality)
-                if os.path.getsize("temp.jpg") <= max_size_bytes or quality <= 10:
-                    break
-                quality -= 5
+    def redo(self):
+        if self.edits and not self.saving_in_progress() and self.edits.redo():
+            self.refresh_preview("重做")
 
-            compressed_image = Image.open("temp.jpg")
-            self.display_image(compressed_image)
-            os.remove("temp.jpg")
+    def compress_image(self):
+        if self.edits:
+            max_size_kb = int(self.size_entry.get())
+            # 压缩效果取决于原图分辨率，预览中不体现，保存时生效
+            self.apply_effect("压缩", ('compress', (max_size_kb, self.shrink_var.get())))
 
     def black_and_white(self):
-        if self.image:
-            bw_image = self.image.convert("L")
-            self.display_image(bw_image)
+        if self.edits:
+            self.apply_effect("黑白化", ('grayscale', ()))
 
     def gaussian_blur(self):
-        if self.image:
-            blurred_image = self.image.filter(ImageFilter.GaussianBlur(5))
-            self.display_image(blurred_image)
+        if self.edits:
+            radius = float(self.blur_radius_entry.get())
+            self.apply_effect("高斯模糊", ('blur', (radius,)))
 
     def crop_image(self):
-        if self.image:
+        if self.edits:
             x = int(self.crop_x_entry.get())
             y = int(self.crop_y_entry.get())
             width = int(self.crop_width_entry.get())
             height = int(self.crop_height_entry.get())
-            cropped_image = self.image.crop((x, y, x + width, y + height))
-            self.display_image(cropped_image)
+            self.apply_effect("裁切", ('crop', (x, y, width, height)))
 
     def resize_image(self):
-        if self.image:
+        if self.edits:
             width = int(self.width_entry.get())
             height = int(self.height_entry.get())
-            if self.aspect_var.get():
-                self.image.thumbnail((width, height))
-                resized_image = self.image
-            else:
-                resized_image = self.image.resize((width, height))
-            self.display_image(resized_image)
+            self.apply_effect("改变尺寸", ('thumbnail' if self.aspect_var.get() else 'resize', (width, height)))
 
     def convert_format(self):
-        if self.image:
+        if self.edits and not self.saving_in_progress():
             format_ = self.format_var.get()
-            converted_image = self.image
-            self.display_image(converted_image)
             save_path = filedialog.asksaveasfilename(defaultextension=f".{format_.lower()}",
                                                      filetypes=[(f"{format_} files", f"*.{format_.lower()}")])
             if save_path:
-                converted_image.save(save_path)
-                messagebox.showinfo("转换格式", f"图片已转换为{format_}格式并保存成功！")
+                self.save_result("转换格式", save_path, format_, f"图片已转换为{format_}格式并保存成功！")
+
+# 文件夹缩略图浏览窗口：已缓存的缩略图立即显示，缺少的在后台线程中生成，点击缩略图在编辑器中打开
+class ThumbnailBrowser:
+    def __init__(self, editor, folder):
+        self.editor = editor
+        self.window = tk.Toplevel(editor.root)
+        self.window.title(f"浏览：{folder}")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.status_var = tk.StringVar()
+        self.status_label = tk.Label(self.window, textvariable=self.status_var)
+        self.status_label.pack(side=tk.BOTTOM, fill=tk.X)
+
+        self.canvas = tk.Canvas(self.window, width=BROWSE_COLUMNS * (TILE_SIZE[0] + 10), height=600)
+        self.scrollbar = tk.Scrollbar(self.window, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.frame = tk.Frame(self.canvas)
+        self.canvas.create_window((0, 0), window=self.frame, anchor=tk.NW)
+        self.frame.bind("<Configure>", lambda event: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
+
+        image_paths = sorted(entry.path for entry in os.scandir(folder)
+                             if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS))
+        self.tiles = {}
+        for i, image_path in enumerate(image_paths):
+            tile = tk.Button(self.frame, text=os.path.basename(image_path), compound=tk.TOP, wraplength=TILE_SIZE[0],
+                             command=lambda path=image_path: self.editor.open_image(path))
+            tile.grid(row=i // BROWSE_COLUMNS, column=i % BROWSE_COLUMNS, padx=5, pady=5)
+            self.tiles[image_path] = tile
+
+        # 缩略图在线程池中读取或生成，完成后放入队列，由 Tk 主循环取出显示
+        self.results = queue.Queue()
+        self.pending = len(image_paths)
+        self.closed = False
+        self.executor = ThreadPoolExecutor(max_workers=image_ops.FILTER_WORKERS)
+        for image_path in image_paths:
+            future = self.executor.submit(self.editor.thumbnails.thumbnail, image_path, PREVIEW_SIZE, load_preview)
+            future.add_done_callback(lambda future, path=image_path: self.results.put((path, future)))
+        self.update_status()
+        self.window.after(POLL_INTERVAL_MS, self.poll)
+
+    def update_status(self):
+        if self.pending:
+            self.status_var.set(f"共 {len(self.tiles)} 张，{self.pending} 张正在生成缩略图")
+        else:
+            self.status_var.set(f"共 {len(self.tiles)} 张")
+
+    def poll(self):
+        if self.closed:
+            return
+        while True:
+            try:
+                image_path, future = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            tile = self.tiles[image_path]
+            try:
+                preview = future.result()
+            except Exception:
+                tile.config(text=f"{os.path.basename(image_path)}\n（无法读取）")
+                continue
+            photo = ImageTk.PhotoImage(preview.resize(fit_size(preview.size, TILE_SIZE), Image.LANCZOS))
+            tile.config(image=photo)
+            tile.image = photo
+        self.update_status()
+        if self.pending:
+            self.window.after(POLL_INTERVAL_MS, self.poll)
+
+    def close(self):
+        self.closed = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.window.destroy()
 
 if __name__ == "__main__":
     root = tk.Tk()
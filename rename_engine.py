@@ -0,0 +1,561 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+
+# 环形重命名（如 a→b、b→a）时使用的临时文件名前缀
+TEMP_PREFIX = '.renaming-'
+
+# 重命名日志目录（位于被重命名的目录中），每批重命名一个日志文件，完成后另写一个完成标记
+JOURNAL_DIR_NAME = '.rename_journal'
+JOURNAL_SUFFIX = '.json'
+DONE_SUFFIX = '.done'
+
+# 并行执行重命名的线程数：改名主要在等待文件系统（尤其是网络共享），线程数可以多于 CPU 核数
+RENAME_WORKERS = 8
+
+# 在文件名末尾（扩展名之前）添加后缀
+def suffix_rule(suffix):
+    def rule(filename):
+        base, ext = os.path.splitext(filename)
+        return base + suffix + ext
+    return rule
+
+# 在文件名前添加前缀
+def prefix_rule(prefix):
+    return lambda filename: prefix + filename
+
+# 在文件名末尾添加当前时间；整批文件使用同一个时间
+def time_rule(now=None):
+    return suffix_rule((now or datetime.datetime.now()).strftime("_%Y%m%d%H%M%S"))
+
+# 比较文件名时使用的键：Windows 等不区分大小写的系统上 A.txt 与 a.txt 是同一个文件
+def name_key(filename):
+    return os.path.normcase(filename)
+
+# 扫描一次目录，返回 ({要重命名的文件名: inode}, 目录中所有条目名, 子目录路径)
+# 子目录不包括日志目录，也不进入指向目录的符号链接
+def scan_directory(directory):
+    files = {}
+    existing = []
+    subdirs = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            existing.append(entry.name)
+            if entry.is_file():
+                files[entry.name] = entry.inode()
+            elif entry.is_dir(follow_symlinks=False) and entry.name != JOURNAL_DIR_NAME:
+                subdirs.append(entry.path)
+    return dict(sorted(files.items())), existing, sorted(subdirs)
+
+# 逐个扫描要处理的目录，生成 (目录, 扫描结果)；recursive 时按深度优先继续扫描子目录，每个目录只扫描一次
+def walk_directories(directory, recursive=False):
+    pending = [directory]
+    while pending:
+        current = pending.pop()
+        scan = scan_directory(current)
+        yield current, scan
+        if recursive:
+            pending.extend(reversed(scan[2]))
+
+# 一个目录中一批重命名的计划：mapping 为 旧名→新名，steps 为实际执行顺序（可能包含临时名），conflicts 为 (旧名, 新名, 原因)
+# inodes 记录每个文件的 inode，用于中断后判断每个文件实际改到了哪一步
+class RenamePlan:
+    def __init__(self, directory, mapping, steps, conflicts, inodes=None):
+        self.directory = directory
+        self.mapping = mapping
+        self.steps = steps
+        self.conflicts = conflicts
+        self.inodes = inodes or {}
+
+# 文件相对于 root 的路径，用于在预览和冲突提示中区分不同子目录中的同名文件
+def relative_name(root, directory, filename):
+    return os.path.normpath(os.path.join(os.path.relpath(directory, root), filename))
+
+# 预览文本，每行一个 "旧名 -> 新名"；多个目录的计划合在一起显示
+def describe_plans(plans, root, limit=None):
+    lines = [f'{relative_name(root, plan.directory, old)} -> {new}' for plan in plans for old, new in plan.mapping.items()]
+    if limit is not None and len(lines) > limit:
+        lines = lines[:limit] + [f'……共 {len(lines)} 个文件']
+    return '\n'.join(lines)
+
+# 所有计划中的冲突 [(相对路径, 新名, 原因)]
+def plan_conflicts(plans, root):
+    return [(relative_name(root, plan.directory, old), new, reason) for plan in plans for old, new, reason in plan.conflicts]
+
+# 检查新文件名是否合法
+def invalid_reason(new_name):
+    if not new_name or new_name in ('.', '..'):
+        return '新文件名为空'
+    if os.sep in new_name or (os.altsep and os.altsep in new_name):
+        return '新文件名包含路径分隔符'
+    return None
+
+# 找出冲突：新名不合法、多个文件得到同一个新名、新名与不参与重命名的已有条目重名
+def find_conflicts(mapping, existing):
+    conflicts = []
+    sources = {name_key(old) for old in mapping}
+    taken = {name_key(name): name for name in existing if name_key(name) not in sources}
+    targets = {}
+    for old, new in mapping.items():
+        reason = invalid_reason(new)
+        key = name_key(new)
+        if reason is None and key in targets:
+            reason = f'与 {targets[key]} 的新文件名相同'
+        elif reason is None and key in taken:
+            reason = f'已存在同名条目 {taken[key]}'
+        if reason:
+            conflicts.append((old, new, reason))
+        targets.setdefault(key, old)
+    return conflicts
+
+# 安排执行顺序：新名被另一个待重命名文件占用时，等那个文件先改名腾出位置；
+# 剩下的都在环中，把环中一个文件先改为临时名来打开环
+def order_steps(mapping, existing):
+    pending = {name_key(old): (old, new) for old, new in mapping.items() if name_key(old) != name_key(new)}
+    # 大小写不同的改名（仅在不区分大小写的系统上键相同）不会与其他文件冲突，直接执行
+    steps = [(old, new) for old, new in mapping.items() if name_key(old) == name_key(new) and old != new]
+    # 新名 → 想改成这个名字的待重命名文件，该名字被腾出后它就可以执行
+    waiting = {name_key(new): key for key, (old, new) in pending.items()}
+    ready = [key for key, (old, new) in pending.items() if name_key(new) not in pending]
+    used = {name_key(name) for name in existing} | {name_key(new) for new in mapping.values()}
+    temp_count = 0
+
+    while pending:
+        while ready:
+            key = ready.pop()
+            old, new = pending.pop(key)
+            steps.append((old, new))
+            # old 已腾出，等待 old 这个名字的文件现在可以改名了
+            waiter = waiting.pop(key, None)
+            if waiter in pending:
+                ready.append(waiter)
+        if pending:
+            key = next(iter(pending))
+            old, new = pending[key]
+            while True:
+                temp_name = f'{TEMP_PREFIX}{temp_count}-{old}'
+                temp_count += 1
+                if name_key(temp_name) not in used:
+                    break
+            used.add(name_key(temp_name))
+            steps.append((old, temp_name))
+            del pending[key]
+            pending[name_key(temp_name)] = (temp_name, new)
+            waiting[name_key(new)] = name_key(temp_name)
+            waiter = waiting.pop(key, None)
+            if waiter in pending:
+                ready.append(waiter)
+    return steps
+
+# 扫描一次目录（或使用已有的扫描结果），按 rule 计算所有文件的新名并检查冲突；只计算不执行
+def plan_renames(directory, rule, scan=None):
+    files, existing, _ = scan or scan_directory(directory)
+    mapping = {}
+    for filename in files:
+        new_name = rule(filename)
+        if new_name != filename:
+            mapping[filename] = new_name
+    conflicts = find_conflicts(mapping, existing)
+    steps = [] if conflicts else order_steps(mapping, existing)
+    return RenamePlan(directory, mapping, steps, conflicts, {old: files[old] for old in mapping})
+
+# 给执行步骤附上 inode：改为临时名的文件，后续从临时名改名的仍是同一个 inode
+def journal_steps(plan):
+    inodes = dict(plan.inodes)
+    steps = []
+    for old, new in plan.steps:
+        inode = inodes.get(old, 0)
+        inodes[new] = inode
+        steps.append([old, new, inode])
+    return steps
+
+# 为 directory（recursive 时包括所有子目录）中每个有文件要改名的目录生成计划
+# progress(已扫描的目录数) 在每扫描一个目录后调用；cancel 为 threading.Event，被设置时停止扫描并返回已生成的计划
+def plan_tree(directory, rule, recursive=False, progress=None, cancel=None):
+    plans = []
+    for scanned, (current, scan) in enumerate(walk_directories(directory, recursive), 1):
+        plan = plan_renames(current, rule, scan)
+        if plan.mapping:
+            plans.append(plan)
+        if progress is not None:
+            progress(scanned)
+        if cancel is not None and cancel.is_set():
+            break
+    return plans
+
+# 把执行步骤分层：一个步骤要等腾出其新名的步骤、以及产生其旧名的步骤（改为临时名）完成后才能执行
+# 同一层中的步骤互不依赖，可以并行执行；没有环和链的批量改名只有一层
+def step_layers(steps):
+    layers = []
+    vacated = {}
+    created = {}
+    for step in steps:
+        old, new = name_key(step[0]), name_key(step[1])
+        level = max(vacated.get(new, -1), created.get(old, -1)) + 1
+        if level == len(layers):
+            layers.append([])
+        layers[level].append(step)
+        # 仅大小写不同的改名不腾出名字
+        if old != new:
+            vacated[old] = level
+        created[new] = level
+    return layers
+
+def rename_step(directory, step):
+    os.rename(os.path.join(directory, step[0]), os.path.join(directory, step[1]))
+
+# 在线程池中执行一层步骤，每成功一步调用 on_step(步骤)；出错或取消时不再开始新的步骤，并等正在执行的步骤结束
+# 成功的步骤追加到 done 中（中断时也是如此），返回第一个错误
+def run_layer(directory, layer, executor, done, on_step, cancel=None):
+    futures = [executor.submit(rename_step, directory, step) for step in layer]
+    steps = dict(zip(futures, layer))
+    try:
+        for future in as_completed(futures):
+            if future.exception() is not None:
+                break
+            on_step(steps[future])
+            if cancel is not None and cancel.is_set():
+                break
+    finally:
+        for future in futures:
+            future.cancel()
+        wait(futures)
+        done.extend(step for future, step in steps.items() if not future.cancelled() and future.exception() is None)
+    return next((future.exception() for future in futures if not future.cancelled() and future.exception()), None)
+
+# 执行一个目录的计划：先写日志再改名，逐层执行，同一层的步骤由线程池并行执行
+# 取消、出错或被中断时，把日志改写为实际完成的步骤并标记完成，已完成的部分可以照常撤回
+def run_plan(plan, executor, on_file, cancel=None):
+    steps = journal_steps(plan)
+    layers = step_layers(steps)
+    generation = write_journal(plan.directory, 'rename', [step for layer in layers for step in layer])
+    targets = {name_key(new) for new in plan.mapping.values()}
+
+    # 改为临时名的一步不算完成一个文件
+    def on_step(step):
+        if name_key(step[1]) in targets:
+            on_file()
+
+    done = []
+    error = None
+    try:
+        for layer in layers:
+            if cancel is not None and cancel.is_set():
+                break
+            error = run_layer(plan.directory, layer, executor, done, on_step, cancel)
+            if error is not None:
+                break
+    finally:
+        if len(done) < len(steps):
+            rewrite_steps(plan.directory, generation, done)
+        mark_done(plan.directory, generation)
+    if error is not None:
+        raise error
+    return sum(1 for step in done if name_key(step[1]) in targets)
+
+# 按计划执行重命名，所有目录共用一个有界线程池；有冲突的计划拒绝执行
+# progress(已完成文件数, 文件总数) 每完成一个文件调用一次；cancel 被设置时在当前正在执行的步骤完成后停止
+# 返回实际重命名的文件数
+def apply_plans(plans, workers=RENAME_WORKERS, progress=None, cancel=None):
+    conflicts = sum(len(plan.conflicts) for plan in plans)
+    if conflicts:
+        raise ValueError(f'有 {conflicts} 个文件名冲突，未执行任何重命名')
+    total = sum(len(plan.mapping) for plan in plans)
+    finished = 0
+
+    def on_file():
+        nonlocal finished
+        finished += 1
+        if progress is not None:
+            progress(finished, total)
+
+    renamed = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for plan in plans:
+            if cancel is not None and cancel.is_set():
+                break
+            if plan.steps:
+                renamed += run_plan(plan, executor, on_file, cancel)
+    return renamed
+
+def apply_plan(plan, workers=RENAME_WORKERS, progress=None, cancel=None):
+    return apply_plans([plan], workers, progress, cancel)
+
+def journal_dir(directory):
+    return os.path.join(directory, JOURNAL_DIR_NAME)
+
+def journal_path(directory, generation, suffix=JOURNAL_SUFFIX):
+    return os.path.join(journal_dir(directory), f'{generation:06d}{suffix}')
+
+# 把目录项的修改刷到磁盘（Windows 不能打开目录，跳过）
+def fsync_dir(path):
+    if os.name != 'posix':
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+# 写入并刷盘一个文件：先写临时文件再原子替换
+def write_durable(path, text):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    fsync_dir(os.path.dirname(path))
+
+# 已有日志的编号（从小到大）
+def journal_generations(directory):
+    try:
+        names = os.listdir(journal_dir(directory))
+    except FileNotFoundError:
+        return []
+    return sorted(int(name[:-len(JOURNAL_SUFFIX)]) for name in names
+                  if name.endswith(JOURNAL_SUFFIX) and name[:-len(JOURNAL_SUFFIX)].isdigit())
+
+def read_journal(directory, generation):
+    with open(journal_path(directory, generation), encoding='utf-8') as f:
+        return json.load(f)
+
+def is_done(directory, generation):
+    return os.path.exists(journal_path(directory, generation, DONE_SUFFIX))
+
+# 在改名之前写入日志：kind 为 rename 或 undo，undo 日志记录撤回的是哪一批
+def write_journal(directory, kind, steps, undoes=None):
+    os.makedirs(journal_dir(directory), exist_ok=True)
+    generations = journal_generations(directory)
+    generation = generations[-1] + 1 if generations else 1
+    journal = {
+        'kind': kind,
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'undoes': undoes,
+        'steps': steps,
+    }
+    write_durable(journal_path(directory, generation), json.dumps(journal, ensure_ascii=False))
+    return generation
+
+# 中途停止时只保留实际完成的步骤，撤回时只撤回这些
+def rewrite_steps(directory, generation, steps):
+    journal = read_journal(directory, generation)
+    journal['steps'] = steps
+    write_durable(journal_path(directory, generation), json.dumps(journal, ensure_ascii=False))
+
+def mark_done(directory, generation):
+    fsync_dir(directory)
+    write_durable(journal_path(directory, generation, DONE_SUFFIX), '')
+
+def run_steps(directory, steps):
+    for old, new in steps:
+        os.rename(os.path.join(directory, old), os.path.join(directory, new))
+
+# 中断后没有完成标记的日志
+def pending_journals(directory):
+    return [generation for generation in journal_generations(directory) if not is_done(directory, generation)]
+
+# 文件当前位于改名链中的第几个名字：按 inode 从最后一个名字往前找；inode 不可用时只看文件是否存在
+def chain_position(directory, names, inode):
+    for position in range(len(names) - 1, -1, -1):
+        try:
+            stat = os.stat(os.path.join(directory, names[position]))
+        except OSError:
+            continue
+        if not inode or not stat.st_ino or stat.st_ino == inode:
+            return position
+    return None
+
+# 恢复中断的日志：按 inode 找出每个文件已经改到了哪一步，按原顺序执行剩下的步骤，返回补做的文件数
+def resume_journal(directory, generation):
+    steps = read_journal(directory, generation)['steps']
+    # 把同一个文件的各步（改为临时名、再改为新名）串成一条链：后一步的旧名就是前一步的新名
+    chains = []
+    by_last_name = {}
+    for index, (old, new, inode) in enumerate(steps):
+        chain = by_last_name.pop(name_key(old), None)
+        if chain is None:
+            chain = ([old], [], inode)
+            chains.append(chain)
+        chain[0].append(new)
+        chain[1].append(index)
+        by_last_name[name_key(new)] = chain
+
+    remaining = []
+    files = 0
+    for names, indexes, inode in chains:
+        position = chain_position(directory, names, inode)
+        if position is None:
+            raise ValueError(f'找不到文件 {names[0]}，无法恢复第 {generation} 次重命名')
+        remaining.extend(indexes[position:])
+        files += position < len(indexes)
+    run_steps(directory, [steps[index][:2] for index in sorted(remaining)])
+    mark_done(directory, generation)
+    return files
+
+# 恢复所有中断的日志，返回补做的文件数
+def resume_pending(directory):
+    return sum(resume_journal(directory, generation) for generation in pending_journals(directory))
+
+# 最近一批已完成且尚未撤回的重命名
+def last_undoable(directory):
+    undone = set()
+    for generation in reversed(journal_generations(directory)):
+        if not is_done(directory, generation):
+            continue
+        journal = read_journal(directory, generation)
+        if journal['kind'] == 'undo':
+            undone.add(journal['undoes'])
+        elif generation not in undone and journal['steps']:
+            # 开始前就被取消的一批没有任何步骤，跳过
+            return generation, journal
+    return None
+
+# 一批步骤涉及的文件数：循环改名时先换到临时名的那一步不单独计数
+def count_files(steps):
+    return sum(1 for _, new, _ in steps if not new.startswith(TEMP_PREFIX))
+
+# 撤回最近一批重命名：把日志中的步骤反过来倒序执行，本身也写日志。多次调用可逐批撤回更早的修改
+# 执行前用一次扫描模拟全部步骤，若文件已被移走或原名已被占用则拒绝执行
+# 返回 (撤回的批次, 撤回的文件数)，没有可撤回的批次时返回 None
+def undo_last(directory):
+    found = last_undoable(directory)
+    if found is None:
+        return None
+    generation, journal = found
+    steps = [[new, old, inode] for old, new, inode in reversed(journal['steps'])]
+
+    _, existing, _ = scan_directory(directory)
+    names = {name_key(name) for name in existing}
+    for old, new, _ in steps:
+        if name_key(old) not in names:
+            raise ValueError(f'文件 {old} 已不存在，无法撤回第 {generation} 次重命名')
+        if name_key(new) in names:
+            raise ValueError(f'{new} 已被占用，无法撤回第 {generation} 次重命名')
+        names.discard(name_key(old))
+        names.add(name_key(new))
+
+    undo_generation = write_journal(directory, 'undo', steps, undoes=generation)
+    run_steps(directory, [step[:2] for step in steps])
+    mark_done(directory, undo_generation)
+    return generation, count_files(journal['steps'])
+
+# 有中断日志的目录（recursive 时包括所有子目录）
+def pending_directories(directory, recursive=False, cancel=None):
+    directories = []
+    for current, _ in walk_directories(directory, recursive):
+        if pending_journals(current):
+            directories.append(current)
+        if cancel is not None and cancel.is_set():
+            break
+    return directories
+
+# 恢复这些目录中所有中断的日志，返回补做的步骤数
+def resume_directories(directories):
+    return sum(resume_pending(directory) for directory in directories)
+
+# 撤回 directory（recursive 时包括所有子目录）中各目录最近一批重命名
+# 某个目录无法撤回时跳过它继续处理其他目录，返回 (撤回的文件数, [(目录, 错误信息)])
+def undo_tree(directory, recursive=False, cancel=None):
+    count = 0
+    errors = []
+    for current, _ in walk_directories(directory, recursive):
+        try:
+            result = undo_last(current)
+        except ValueError as e:
+            errors.append((current, str(e)))
+        else:
+            if result is not None:
+                count += result[1]
+        if cancel is not None and cancel.is_set():
+            break
+    return count, errors
+
+# 命令行进度：每隔一段时间在同一行刷新一次已完成数和速度
+class ProgressPrinter:
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.start = time.monotonic()
+        self.last = 0.0
+
+    def __call__(self, done, total):
+        now = time.monotonic()
+        if now - self.last < self.interval and done < total:
+            return
+        self.last = now
+        rate = done / max(now - self.start, 1e-9)
+        print(f'\r已重命名 {done}/{total} 个文件（{rate:.0f} 个/秒）', end='', file=sys.stderr, flush=True)
+        if done == total:
+            print(file=sys.stderr)
+
+# 主函数
+def main():
+    parser = argparse.ArgumentParser(description='批量重命名目录中的文件（无需显示器）。每批修改都记录日志，可撤回，中断后可恢复。')
+    parser.add_argument('directory', type=str, help='要处理的目录')
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--suffix', type=str, help='在文件名末尾（扩展名之前）添加后缀')
+    action.add_argument('--prefix', type=str, help='在文件名前添加前缀')
+    action.add_argument('--time', action='store_true', help='在文件名末尾添加当前时间')
+    action.add_argument('--undo', action='store_true', help='撤回最近一批重命名（与 --recursive 一起使用时各目录分别撤回）')
+    action.add_argument('--resume', action='store_true', help='完成上次中断的重命名')
+    parser.add_argument('--recursive', action='store_true', help='同时处理所有子目录')
+    parser.add_argument('--workers', type=int, default=RENAME_WORKERS, help=f'并行重命名的线程数（默认: {RENAME_WORKERS}）')
+    parser.add_argument('--dry-run', action='store_true', help='只列出重命名计划，不修改文件')
+
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error(f'--workers 必须为正整数: {args.workers}')
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if not os.path.isdir(args.directory):
+        logging.error(f'目录 {args.directory} 不存在')
+        sys.exit(1)
+
+    pending = pending_directories(args.directory, args.recursive)
+    if args.resume:
+        logging.info(f'已完成上次中断的重命名（补做 {resume_directories(pending)} 个文件）')
+        return
+    if pending:
+        logging.error(f'有 {len(pending)} 个目录中的重命名在中途中断，请先使用 --resume 完成')
+        sys.exit(1)
+
+    if args.undo:
+        count, errors = undo_tree(args.directory, args.recursive)
+        for directory, error in errors:
+            logging.error(f'{directory}: {error}')
+        logging.info(f'已撤回 {count} 个文件的修改')
+        sys.exit(1 if errors else 0)
+
+    if args.suffix is not None:
+        rule = suffix_rule(args.suffix)
+    elif args.prefix is not None:
+        rule = prefix_rule(args.prefix)
+    else:
+        rule = time_rule()
+    plans = plan_tree(args.directory, rule, args.recursive)
+    conflicts = plan_conflicts(plans, args.directory)
+    if conflicts:
+        for name, new, reason in conflicts:
+            logging.error(f'{name} -> {new}：{reason}')
+        logging.error(f'有 {len(conflicts)} 个文件名冲突，未执行任何重命名')
+        sys.exit(1)
+    if args.dry_run:
+        print(describe_plans(plans, args.directory))
+        return
+
+    try:
+        renamed = apply_plans(plans, args.workers, ProgressPrinter())
+    except KeyboardInterrupt:
+        print(file=sys.stderr)
+        logging.warning('已中断；已完成的修改可用 --undo 撤回')
+        sys.exit(130)
+    logging.info(f'已重命名 {renamed} 个文件')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+
+from attendance_generator import generate_workbook
+
+# 脚本所在目录（各入口脚本都在这里）
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 导入较慢的第三方库；入口脚本只应在真正用到它们的代码路径中导入
+HEAVY_MODULES = ['pandas', 'numpy', 'matplotlib', 'openpyxl', 'pyarrow', 'PIL', 'tkinter']
+
+# 默认的冷启动时间预算（秒）：只显示帮助的运行，以及只输出表格（不画图）的运行
+DEFAULT_HELP_BUDGET = 0.5
+DEFAULT_RUN_BUDGET = 1.0
+
+# 在子进程中运行入口脚本，结束后把已导入的重型模块和退出码写入结果文件
+# run_name 不为 __main__ 时只导入模块（用于图形界面脚本，不打开窗口）
+CHILD_CODE = '''
+import sys, json, runpy, traceback
+script, run_name, result_file, heavy = sys.argv[1], sys.argv[2], sys.argv[3], sys.argv[4].split(',')
+sys.argv = [script] + sys.argv[5:]
+sys.path.insert(0, {script_dir!r})
+exit_code = 0
+try:
+    runpy.run_path(script, run_name=run_name)
+except SystemExit as e:
+    # 与解释器相同：None 为 0，整数原样，其他（如错误信息字符串）为 1
+    exit_code = 0 if e.code is None else e.code if isinstance(e.code, int) else 1
+except Exception:
+    traceback.print_exc()
+    exit_code = 1
+with open(result_file, 'w', encoding='utf-8') as f:
+    json.dump({{'modules': sorted(name for name in heavy if name in sys.modules), 'exit_code': exit_code}}, f)
+'''
+
+# 各项检查：(名称, 脚本, run_name, 参数, 允许导入的重型模块, 预算类型, 运行后应存在的输出文件)
+def startup_cases(workdir):
+    input_file = generate_workbook(os.path.join(workdir, 'input.xlsx'), 'excel', employees=5, days=7)
+    output_file = os.path.join(workdir, 'output.xlsx')
+    return [
+        ('attendance_excel --help', 'attendance_excel.py', '__main__', ['--help'], [], 'help', []),
+        ('attendance_excel 仅输出表格', 'attendance_excel.py', '__main__', ['--input', input_file, '--output', output_file],
+         ['pandas', 'numpy', 'openpyxl', 'pyarrow', 'PIL'], 'run', [output_file]),  # openpyxl 自己会导入 PIL
+        ('attendance_ingest --help', 'attendance_ingest.py', '__main__', ['--help'], [], 'help', []),
+        ('attendance_generator --help', 'attendance_generator.py', '__main__', ['--help'], ['numpy'], 'help', []),
+        ('rename_engine --help', 'rename_engine.py', '__main__', ['--help'], [], 'help', []),
+        ('image_batch --help', 'image_batch.py', '__main__', ['--help'], ['PIL'], 'help', []),
+        ('考勤2.0 导入', '考勤2.0.py', 'kaoqin', [], ['tkinter'], 'help', []),
+    ]
+
+# 冷启动运行一次，返回 (耗时, 已导入的重型模块, 退出码, 缺少的输出文件)
+# 运行前删除输出文件，避免把上一次运行留下的文件当作本次的输出
+def run_once(script, run_name, args, result_file, outputs=()):
+    for path in (result_file, *outputs):
+        if os.path.exists(path):
+            os.remove(path)
+    code = CHILD_CODE.format(script_dir=SCRIPT_DIR)
+    command = [sys.executable, '-c', code, os.path.join(SCRIPT_DIR, script), run_name, result_file, ','.join(HEAVY_MODULES)] + args
+    start = time.perf_counter()
+    process = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    elapsed = time.perf_counter() - start
+    missing = [path for path in outputs if not os.path.exists(path)]
+    try:
+        with open(result_file, encoding='utf-8') as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        # 子进程在写结果文件之前就已退出（如解释器崩溃）
+        return elapsed, [], process.returncode or 1, missing
+    return elapsed, result['modules'], result['exit_code'], missing
+
+# 运行全部检查；多次运行取最短时间
+def run_checks(repeat=3, budgets=None):
+    budgets = budgets or {'help': DEFAULT_HELP_BUDGET, 'run': DEFAULT_RUN_BUDGET}
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        result_file = os.path.join(workdir, 'modules.json')
+        for name, script, run_name, args, allowed, budget, outputs in startup_cases(workdir):
+            runs = [run_once(script, run_name, args, result_file, outputs) for _ in range(repeat)]
+            _, modules, _, _ = runs[-1]
+            results[name] = {
+                'seconds': min(seconds for seconds, _, _, _ in runs),
+                'budget': budgets[budget],
+                'unexpected_modules': [module for module in modules if module not in allowed],
+                # 任一次运行失败即记录该次的退出码和缺少的输出
+                'exit_code': next((exit_code for _, _, exit_code, _ in runs if exit_code), 0),
+                'missing_outputs': sorted({os.path.basename(path) for _, _, _, missing in runs for path in missing}),
+            }
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'checks': results,
+    }
+
+# 超出预算、导入了不该导入的模块、退出码非零或没有生成输出的检查项 [(名称, 原因)]
+def find_failures(results):
+    failures = []
+    for name, check in results['checks'].items():
+        if check['exit_code']:
+            failures.append((name, f"退出码 {check['exit_code']}"))
+        if check['missing_outputs']:
+            failures.append((name, f"没有生成 {', '.join(check['missing_outputs'])}"))
+        if check['seconds'] > check['budget']:
+            failures.append((name, f"{check['seconds'] * 1000:.0f} ms 超出预算 {check['budget'] * 1000:.0f} ms"))
+        if check['unexpected_modules']:
+            failures.append((name, f"导入了 {', '.join(check['unexpected_modules'])}"))
+    return failures
+
+# 主函数
+def main():
+    parser = argparse.ArgumentParser(description='检查各入口脚本的冷启动时间和导入的重型模块。')
+    parser.add_argument('--repeat', type=int, default=3, help='每项的重复次数，取最短时间（默认: 3）')
+    parser.add_argument('--help-budget', type=float, default=DEFAULT_HELP_BUDGET,
+                        help=f'只显示帮助或只导入时的时间预算（秒，默认: {DEFAULT_HELP_BUDGET}）')
+    parser.add_argument('--run-budget', type=float, default=DEFAULT_RUN_BUDGET,
+                        help=f'只输出表格的小工作簿处理的时间预算（秒，默认: {DEFAULT_RUN_BUDGET}）')
+    parser.add_argument('--output', type=str, default=None, help='将结果保存为 JSON 文件')
+
+    args = parser.parse_args()
+
+    results = run_checks(args.repeat, {'help': args.help_budget, 'run': args.run_budget})
+
+    for name, check in results['checks'].items():
+        print(f"{name:32s} {check['seconds'] * 1000:8.1f} ms / {check['budget'] * 1000:.0f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    failures = find_failures(results)
+    for name, reason in failures:
+        print(f'启动检查失败: {name} {reason}')
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,60 +1,87 @@
-import pandas as pd
 import re
+import os
 import logging
-from tkinter import Tk, Label, Button, Entry, StringVar, filedialog
-from tkinter import messagebox
-import threading
+from tkinter import Tk, Frame, Label, Button, Entry, Checkbutton, StringVar, BooleanVar, filedialog
+from tkinter import messagebox, ttk
+from functools import lru_cache
+from attendance_output import OUTPUT_FORMATS, open_record_writer, output_paths, write_output
+from attendance_metrics import NO_METRICS, RunMetrics
+from attendance_jobs import NO_JOB, JobCancelled, JobRunner
+from attendance_analytics import DEFAULT_WORK_END, DEFAULT_WORK_START, analyze_attendance, summary_files, write_summary
+from attendance_ingest import is_ingested, iter_ingested_rows, read_ingested
+from attendance_cache import (ROW_COLUMN, ParseCache, cached_column_frames, column_digest, default_cache_dir, file_digest,
+                              merge_column_frames, values_digest)
+
+# 输出表格的列名
+OUTPUT_COLUMNS = ['姓名', '日期', '星期', '上班时间', '午休开始', '午休结束', '下班时间']
+
+# 预编译的考勤单元格语法：状态(时间) 和 HH:MM（时 00-23、分 00-59，与 attendance_schema.unique_minutes 的范围一致）
+RECORD_PATTERN = re.compile(r'(\w+)\((.*?)\)')
+TIME_PATTERN = re.compile(r"^(?:[01]\d|2[0-3]):[0-5]\d$")
+
+# 磁盘解析缓存的命名空间；解析规则变化时修改版本号使旧缓存失效
+CACHE_SALT = 'kaoqin/3'
+
+# GUI 记录性能数据时写入的文件名（位于输出目录）
+METRICS_FILE_NAME = 'attendance_metrics.jsonl'
+
+# 单元格解析缓存的容量（不同取值的个数）
+PARSE_CACHE_SIZE = 65536
+
+# 界面检查后台任务进度的间隔（毫秒）
+POLL_INTERVAL_MS = 100
+
+# pandas、numpy 和 openpyxl 导入较慢，只在用到它们的函数中导入，窗口打开时不必等待
+
+# 处理失败时抛出，消息直接显示给用户
+class AttendanceError(Exception):
+    pass
 
 # 检查字符串是否为有效时间格式 (HH:MM)
 def is_time_format(s):
     try:
-        return bool(re.match(r"^\d{2}:\d{2}$", s))
+        return bool(TIME_PATTERN.match(s))
     except:
         return False
 
+# 解析单条 "状态(时间)" 记录，返回 (状态, 时间)
+def parse_record(part):
+    part = part.strip()
+    match = RECORD_PATTERN.match(part)
+    if match:
+        return match.group(1), match.group(2)
+    return part, ''
+
 # 解析考勤信息的函数
 def parse_attendance_info(attendance_info):
+    import pandas as pd
+
+    if pd.isna(attendance_info) or attendance_info.strip() == '':
+        return '', '', '', ''
+    return parse_cell(attendance_info)
+
+# 解析非空单元格文本；同一文本只解析一次
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_cell(attendance_info):
     # 初始化
     start_time = ''
     end_time = ''
     start_status = ''
     end_status = ''
 
-    if pd.isna(attendance_info) or attendance_info.strip() == '':
-        return start_status, start_time, end_status, end_time
-
     # 分割多条记录
     records = attendance_info.split(';')
     for record in records:
         # 分割上班和下班信息
         parts = record.split(',')
         if len(parts) >= 2:
-            # 处理上班信息
-            start_match = re.match(r'(\w+)\((.*?)\)', parts[0].strip())
-            if start_match:
-                start_status = start_match.group(1)
-                start_time = start_match.group(2)
-            else:
-                start_status = parts[0].strip()
-                start_time = ''
-            # 处理下班信息
-            end_match = re.match(r'(\w+)\((.*?)\)', parts[1].strip())
-            if end_match:
-                end_status = end_match.group(1)
-                end_time = end_match.group(2)
-            else:
-                end_status = parts[1].strip()
-                end_time = ''
+            # 处理上班和下班信息
+            start_status, start_time = parse_record(parts[0])
+            end_status, end_time = parse_record(parts[1])
             break  # 只处理第一条记录
         elif len(parts) == 1:
             # 处理只有上班或下班信息的情况
-            match = re.match(r'(\w+)\((.*?)\)', parts[0].strip())
-            if match:
-                start_status = match.group(1)
-                start_time = match.group(2)
-            else:
-                start_status = parts[0].strip()
-                start_time = ''
+            start_status, start_time = parse_record(parts[0])
             end_status = start_status
             end_time = start_time
             break
@@ -63,97 +90,295 @@ def parse_attendance_info(attendance_info):
 
     return start_status, start_time, end_status, end_time
 
-# 处理考勤数据的函数
-def process_attendance(input_file, output_file, lunch_start='12:00', lunch_end='13:30'):
+# 根据解析出的状态和时间确定表格中显示的值
+def resolve_time(status, time):
+    if status in ['休息', '请假']:
+        return status
+    elif status == '正常':
+        return time if is_time_format(time) else '-'
+    elif status in ['外出', '外勤']:
+        return status
+    else:
+        return '-'
+
+# 将单元格解析为 (上班时间, 下班时间) 显示值；同一文本只计算一次
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def resolve_cell(attendance_info):
+    start_status, start_time, end_status, end_time = parse_attendance_info(attendance_info)
+    return resolve_time(start_status, start_time), resolve_time(end_status, end_time)
+
+# 返回单元格解析缓存的命中情况
+def parse_cache_stats():
+    info = resolve_cell.cache_info()
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize}
+
+# 记录单元格解析缓存的命中情况
+def log_parse_cache_stats():
+    stats = parse_cache_stats()
+    logging.info(f"单元格解析缓存：命中 {stats['hits']} 次，未命中 {stats['misses']} 次，缓存 {stats['size']} 项")
+
+# 清空单元格解析缓存
+def clear_parse_cache():
+    parse_cell.cache_clear()
+    resolve_cell.cache_clear()
+
+# 拆分考勤日期列名，列名示例：'2024-09-01 星期日'
+def split_date_column(col):
+    date_info = str(col).split(' ')
+    if len(date_info) >= 2:
+        return date_info[0], date_info[1]
+    return date_info[0], ''
+
+# 将一个人的一行考勤数据转换为逐日记录
+def build_records(name, cells, date_columns, lunch_start, lunch_end):
+    for (date, day_of_week), attendance_info in zip(date_columns, cells):
+        if attendance_info is None or attendance_info != attendance_info:
+            attendance_info = None  # 统一空单元格，避免每个 NaN 各占一个缓存项
+        actual_start_time, actual_end_time = resolve_cell(attendance_info)
+        yield [
+            name,
+            date,
+            day_of_week,
+            actual_start_time,
+            lunch_start,
+            lunch_end,
+            actual_end_time
+        ]
+
+# 解析单个日期列的所有人的记录，附带行位置以便与其他列合并
+def column_records(names, cells, date_column, lunch_start, lunch_end):
+    import numpy as np
+    import pandas as pd
+
+    processed_records = []
+    for name, attendance_info in zip(names, cells):
+        processed_records.extend(build_records(name, (attendance_info,), (date_column,), lunch_start, lunch_end))
+    frame = pd.DataFrame(processed_records, columns=OUTPUT_COLUMNS)
+    frame[ROW_COLUMN] = np.arange(len(frame))
+    return frame
+
+# 处理考勤数据的函数；指定 cache_dir 时复用内容未变化的日期列的解析结果
+# 指定 summary_file 时同时生成工时统计表（流式处理不支持）；work_hours 为 (上班时间, 下班时间)，用于判断迟到和早退
+# 出错时抛出 AttendanceError；job 被取消时抛出 JobCancelled。返回写出的记录数
+def process_attendance(input_file, output_file, lunch_start='12:00', lunch_end='13:30', streaming=False, output_formats=('xlsx',),
+                       cache_dir=None, metrics=NO_METRICS, job=NO_JOB, summary_file=None,
+                       work_hours=(DEFAULT_WORK_START, DEFAULT_WORK_END)):
+    from attendance_schema import display_attendance
+
+    if streaming:
+        return stream_attendance(input_file, output_file, lunch_start, lunch_end, output_formats, metrics, job)
+
+    cache = None
+    processed_df = None
+    salt = f'{CACHE_SALT}\0{lunch_start}\0{lunch_end}'
+    if cache_dir is not None and os.path.isfile(input_file):
+        # 整个工作簿未变化时直接复用上次的结果
+        cache = ParseCache(cache_dir)
+        workbook_key = file_digest(input_file, salt)
+        processed_df = cache.get(workbook_key)
+    if processed_df is None:
+        processed_df = load_attendance(input_file, lunch_start, lunch_end, cache, salt, metrics, job)
+        if cache is not None:
+            cache.put(workbook_key, processed_df)
+
+    # 写出开始后不再响应取消（统计表也一起生成），避免留下写了一半的文件或缺少统计表的结果
+    job.stage('写入')
     try:
-        # 读取 Excel 文件，使用第二行作为列名
-        data = pd.read_excel(input_file, header=1)
+        # 将清理后的 DataFrame 按所选格式保存（默认 Excel）
+        with metrics.stage('write') as counts:
+            display_df = display_attendance(processed_df)
+            write_output(display_df, output_file, output_formats)
+            counts['rows'] = len(display_df)
+            counts['cells'] = display_df.size
     except Exception as e:
-        logging.error(f"读取输入文件出错: {e}")
-        messagebox.showerror("错误", f"读取输入文件出错: {e}")
-        return
+        logging.error(f"写入输出文件出错: {e}")
+        raise AttendanceError(f"写入输出文件出错: {e}") from e
+
+    if summary_file:
+        job.report('统计')
+        try:
+            with metrics.stage('analyze') as counts:
+                tables = analyze_attendance(processed_df, *work_hours)
+                counts['rows'] = len(processed_df)
+            with metrics.stage('write_summary') as counts:
+                write_summary(tables, summary_file, output_formats)
+                counts['rows'] = sum(len(table) for table in tables.values())
+        except Exception as e:
+            logging.error(f"生成统计表出错: {e}")
+            raise AttendanceError(f"生成统计表出错: {e}") from e
+    log_parse_cache_stats()
+    if cache is not None:
+        logging.info(f"磁盘解析缓存：命中 {cache.hits} 项，未命中 {cache.misses} 项")
+    metrics.emit()
+    return len(processed_df)
 
-    # 重命名第一列为 '姓名'（如果未命名）
-    if data.columns[0] != '姓名':
-        data.rename(columns={data.columns[0]: '姓名'}, inplace=True)
+# 读取 Excel 文件，使用第二行作为列名；已转换的 .arrow 文件以内存映射方式打开
+def read_attendance(input_file):
+    import pandas as pd
 
-    if '姓名' not in data.columns:
-        logging.error("输入文件缺少必要的列：姓名")
-        messagebox.showerror("错误", "输入文件缺少必要的列：姓名")
-        return
+    if is_ingested(input_file):
+        return read_ingested(input_file, header=1)
+    return pd.read_excel(input_file, header=1)
 
-    # 获取考勤数据列的起始索引
+# 读取并解析工作簿，出错时抛出 AttendanceError
+def load_attendance(input_file, lunch_start, lunch_end, cache=None, salt=CACHE_SALT, metrics=NO_METRICS, job=NO_JOB):
+    job.stage('读取')
     try:
-        start_col_index = data.columns.tolist().index('迟到时长(小时)') + 1
-    except ValueError:
-        logging.error("无法找到'迟到时长(小时)'列")
-        messagebox.showerror("错误", "无法找到'迟到时长(小时)'列")
-        return
+        with metrics.stage('read') as counts:
+            data = read_attendance(input_file)
+            counts['rows'] = len(data)
+            counts['cells'] = data.size
+    except Exception as e:
+        logging.error(f"读取输入文件出错: {e}")
+        raise AttendanceError(f"读取输入文件出错: {e}") from e
 
-    # 获取考勤日期列
-    attendance_columns = data.columns[start_col_index:]
+    return parse_attendance(data, lunch_start, lunch_end, cache, salt, metrics, job)
 
-    # 初始化一个空列表来存储处理后的记录
-    processed_records = []
+# 将读取的宽表解析为逐人逐日的记录（紧凑表示，见 attendance_schema），出错时抛出 AttendanceError
+# 每解析一行（一个人）报告一次进度
+def parse_attendance(data, lunch_start='12:00', lunch_end='13:30', cache=None, salt=CACHE_SALT, metrics=NO_METRICS, job=NO_JOB):
+    import pandas as pd
+    from attendance_schema import compact_attendance
 
-    # 遍历每个人的数据
-    for index, row in data.iterrows():
-        name = row['姓名']
-        # 遍历考勤日期列
-        for col in attendance_columns:
-            # 列名示例：'2024-09-01 星期日'
-            date_info = str(col).split(' ')
-            if len(date_info) >= 2:
-                date = date_info[0]
-                day_of_week = date_info[1]
-            else:
-                date = date_info[0]
-                day_of_week = ''
-            
-            attendance_info = row[col]
-            start_status, start_time, end_status, end_time = parse_attendance_info(attendance_info)
-
-            # 根据解析结果，确定上班时间和下班时间
-            if start_status in ['休息', '请假']:
-                actual_start_time = start_status
-            elif start_status == '正常':
-                actual_start_time = start_time if is_time_format(start_time) else '-'
-            elif start_status in ['外出', '外勤']:
-                actual_start_time = start_status
-            else:
-                actual_start_time = '-'
-
-            if end_status in ['休息', '请假']:
-                actual_end_time = end_status
-            elif end_status == '正常':
-                actual_end_time = end_time if is_time_format(end_time) else '-'
-            elif end_status in ['外出', '外勤']:
-                actual_end_time = end_status
-            else:
-                actual_end_time = '-'
-
-            # 将处理后的记录添加到列表中
-            processed_records.append([
-                name,
-                date,
-                day_of_week,
-                actual_start_time,
-                lunch_start,
-                lunch_end,
-                actual_end_time
-            ])
-
-    # 从处理后的记录创建一个 DataFrame
-    processed_df = pd.DataFrame(processed_records, columns=['姓名', '日期', '星期', '上班时间', '午休开始', '午休结束', '下班时间'])
+    with metrics.stage('header') as counts:
+        # 跳过空行（与流式处理一致），否则中间的空行会变成没有姓名的记录
+        data = data.dropna(how='all', ignore_index=True)
+
+        # 重命名第一列为 '姓名'（如果未命名）
+        if data.columns[0] != '姓名':
+            data.rename(columns={data.columns[0]: '姓名'}, inplace=True)
+
+        if '姓名' not in data.columns:
+            logging.error("输入文件缺少必要的列：姓名")
+            raise AttendanceError("输入文件缺少必要的列：姓名")
+
+        # 获取考勤数据列的起始索引
+        try:
+            start_col_index = data.columns.tolist().index('迟到时长(小时)') + 1
+        except ValueError:
+            logging.error("无法找到'迟到时长(小时)'列")
+            raise AttendanceError("无法找到'迟到时长(小时)'列") from None
+
+        # 获取考勤日期列
+        attendance_columns = data.columns[start_col_index:]
+        date_columns = [split_date_column(col) for col in attendance_columns]
+        counts['columns'] = len(data.columns)
 
+    if cache is not None:
+        # 只解析内容有变化的日期列
+        with metrics.stage('parse') as counts:
+            names_digest = values_digest(data['姓名'])
+            cells = [data.iloc[:, start_col_index + i] for i in range(len(attendance_columns))]
+            keys = [column_digest(salt, str(col), names_digest, cells[i]) for i, col in enumerate(attendance_columns)]
+
+            # 按列解析时每解析一列报告一次进度
+            def parse_column(i):
+                job.advance('解析日期列', i, len(attendance_columns))
+                return column_records(data['姓名'], cells[i], date_columns[i], lunch_start, lunch_end)
+
+            frames = cached_column_frames(cache, keys, parse_column)
+            counts['cells'] = len(data) * len(attendance_columns)
+        with metrics.stage('build') as counts:
+            processed_df = merge_column_frames(frames, OUTPUT_COLUMNS)
+            counts['rows'] = len(processed_df)
+    else:
+        with metrics.stage('parse') as counts:
+            # 初始化一个空列表来存储处理后的记录
+            processed_records = []
+
+            # 遍历每个人的数据
+            rows = data[attendance_columns].itertuples(index=False, name=None)
+            for done, (name, cells) in enumerate(zip(data['姓名'], rows)):
+                job.advance('解析', done, len(data))
+                processed_records.extend(build_records(name, cells, date_columns, lunch_start, lunch_end))
+            counts['cells'] = len(data) * len(attendance_columns)
+
+        with metrics.stage('build') as counts:
+            # 从处理后的记录创建一个 DataFrame
+            processed_df = pd.DataFrame(processed_records, columns=OUTPUT_COLUMNS)
+            counts['rows'] = len(processed_df)
+
+    # 转换为紧凑表示，导出时再生成显示字符串
+    with metrics.stage('compact') as counts:
+        processed_df = compact_attendance(processed_df, lunch_start, lunch_end)
+        counts['rows'] = len(processed_df)
+    return processed_df
+
+# 流式处理考勤数据：逐行读取、逐行写出，内存占用与表格大小无关
+# 出错时抛出 AttendanceError；job 被取消时删除已写出的部分并抛出 JobCancelled。返回写出的记录数
+def stream_attendance(input_file, output_file, lunch_start='12:00', lunch_end='13:30', output_formats=('xlsx',), metrics=NO_METRICS,
+                      job=NO_JOB):
+    job.stage('读取')
+    workbook = None
     try:
-        # 将清理后的 DataFrame 保存为新的 Excel 文件
-        processed_df.to_excel(output_file, index=False)
-        messagebox.showinfo("成功", "数据处理完成！")
+        with metrics.stage('read'):
+            if is_ingested(input_file):
+                # 已转换的文件按批内存映射读取
+                rows = iter_ingested_rows(input_file)
+            else:
+                # 只读模式按行读取工作簿，不会把整张表加载进内存
+                from openpyxl import load_workbook
+                workbook = load_workbook(input_file, read_only=True, data_only=True)
+                worksheet = workbook.worksheets[0]
+                worksheet.reset_dimensions()
+                rows = worksheet.iter_rows(values_only=True)
     except Exception as e:
-        logging.error(f"写入输出文件出错: {e}")
-        messagebox.showerror("错误", f"写入输出文件出错: {e}")
-        return
+        logging.error(f"读取输入文件出错: {e}")
+        raise AttendanceError(f"读取输入文件出错: {e}") from e
+
+    try:
+        with metrics.stage('header') as counts:
+            # 第一行是标题，第二行是列名（与 header=1 一致）
+            next(rows, None)
+            header = list(next(rows, None) or [])
+            header = [f'Unnamed: {i}' if col is None else col for i, col in enumerate(header)]
+
+            try:
+                start_col_index = header.index('迟到时长(小时)') + 1
+            except ValueError:
+                logging.error("无法找到'迟到时长(小时)'列")
+                raise AttendanceError("无法找到'迟到时长(小时)'列") from None
+
+            date_columns = [split_date_column(col) for col in header[start_col_index:]]
+            width = len(header)
+            counts['columns'] = width
+
+        writer = None
+        try:
+            # 逐行追加到输出文件，写出的行不会保留在内存中
+            # 流式模式下读取、解析和写出交替进行，统一记为 stream 阶段；总行数事先未知
+            with metrics.stage('stream') as counts:
+                writer = open_record_writer(output_file, OUTPUT_COLUMNS, output_formats)
+
+                records = 0
+                for done, row in enumerate(rows):
+                    job.advance('处理', done)
+                    if all(value is None for value in row):
+                        continue  # 跳过空行
+                    row = tuple(row[:width]) + (None,) * (width - len(row))
+                    for record in build_records(row[0], row[start_col_index:], date_columns, lunch_start, lunch_end):
+                        writer.append(record)
+                        records += 1
+
+                job.stage('写入')
+                writer.close()
+                counts['rows'] = records
+                counts['cells'] = records
+        except JobCancelled:
+            writer.discard()
+            raise
+        except Exception as e:
+            # 删除写了一半的输出文件并关闭文件句柄
+            if writer is not None:
+                writer.discard()
+            logging.error(f"写入输出文件出错: {e}")
+            raise AttendanceError(f"写入输出文件出错: {e}") from e
+        log_parse_cache_stats()
+        metrics.emit()
+        return records
+    finally:
+        if workbook is not None:
+            workbook.close()
 
 # GUI 应用
 class AttendanceApp:
@@ -165,6 +390,13 @@ class AttendanceApp:
         self.output_file = StringVar()
         self.lunch_start = StringVar(value='12:00')
         self.lunch_end = StringVar(value='13:30')
+        self.streaming = BooleanVar(value=False)
+        self.use_cache = BooleanVar(value=False)
+        self.record_metrics = BooleanVar(value=False)
+        self.summary = BooleanVar(value=False)
+        self.work_start = StringVar(value=DEFAULT_WORK_START)
+        self.work_end = StringVar(value=DEFAULT_WORK_END)
+        self.output_formats = {fmt: BooleanVar(value=(fmt == 'xlsx')) for fmt in OUTPUT_FORMATS}
 
         Label(root, text="输入文件路径").grid(row=0, column=0)
         Entry(root, textvariable=self.input_file, width=40).grid(row=0, column=1)
@@ -180,10 +412,45 @@ class AttendanceApp:
         Label(root, text="午休结束时间").grid(row=3, column=0)
         Entry(root, textvariable=self.lunch_end, width=40).grid(row=3, column=1)
 
-        Button(root, text="处理数据", command=self.process_and_generate).grid(row=4, column=0, columnspan=3)
+        Label(root, text="输出格式").grid(row=4, column=0)
+        format_frame = Frame(root)
+        format_frame.grid(row=4, column=1)
+        for fmt, var in self.output_formats.items():
+            Checkbutton(format_frame, text=fmt, variable=var).pack(side='left')
+
+        Checkbutton(root, text="流式处理（超大文件）", variable=self.streaming).grid(row=5, column=1)
+
+        Checkbutton(root, text="使用解析缓存（只解析有变化的日期列）", variable=self.use_cache).grid(row=6, column=1)
+        Button(root, text="清空缓存", command=self.clear_cache).grid(row=6, column=2)
+
+        Checkbutton(root, text="记录性能数据（写入输出目录的 attendance_metrics.jsonl）", variable=self.record_metrics).grid(row=7, column=1)
+
+        Checkbutton(root, text="生成工时统计（迟到、早退、请假等，保存为输出文件加 _daily/_person/_month 后缀）",
+                    variable=self.summary).grid(row=8, column=1)
+
+        Label(root, text="上班/下班时间").grid(row=9, column=0)
+        work_frame = Frame(root)
+        work_frame.grid(row=9, column=1)
+        Entry(work_frame, textvariable=self.work_start, width=10).pack(side='left')
+        Entry(work_frame, textvariable=self.work_end, width=10).pack(side='left')
+
+        Button(root, text="处理数据", command=self.process_and_generate).grid(row=10, column=0, columnspan=3)
+
+        # 后台任务的状态、进度和取消按钮
+        self.status = StringVar()
+        Label(root, textvariable=self.status).grid(row=11, column=0, columnspan=2, sticky='w')
+        self.progress = ttk.Progressbar(root, mode='determinate', length=200)
+        self.progress.grid(row=11, column=1, sticky='e')
+        self.cancel_button = Button(root, text="取消", command=self.cancel_jobs, state='disabled')
+        self.cancel_button.grid(row=11, column=2)
+
+        # 处理在单个后台线程中按提交顺序执行，后台线程不访问任何界面对象
+        self.runner = JobRunner()
+        self.polling = False
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
 
     def browse_input_file(self):
-        file_path = filedialog.askopenfilename(filetypes=[("Excel文件", "*.xlsx")])
+        file_path = filedialog.askopenfilename(filetypes=[("Excel文件", "*.xlsx"), ("转换后的考勤文件", "*.arrow")])
         if file_path:
             self.input_file.set(file_path)
 
@@ -199,16 +466,122 @@ class AttendanceApp:
         if not self.output_file.get():
             messagebox.showwarning("警告", "请选择输出文件！")
             return
+        if not self.selected_formats():
+            messagebox.showwarning("警告", "请至少选择一种输出格式！")
+            return
+        if self.summary.get():
+            if self.streaming.get():
+                messagebox.showwarning("警告", "流式处理不支持生成工时统计！")
+                return
+            from attendance_schema import parse_minutes
+            try:
+                parse_minutes(self.work_start.get())
+                parse_minutes(self.work_end.get())
+            except ValueError as e:
+                messagebox.showwarning("警告", str(e))
+                return
+
+        # 所有参数在界面线程中读取好再交给后台线程
+        input_file = self.input_file.get()
+        output_file = self.output_file.get()
+        lunch_start = self.lunch_start.get()
+        lunch_end = self.lunch_end.get()
+        streaming = self.streaming.get()
+        output_formats = self.selected_formats()
+        cache_dir = default_cache_dir(input_file) if self.use_cache.get() else None
+        metrics = self.create_metrics()
+        summary_file = output_file if self.summary.get() else None
+        work_hours = (self.work_start.get(), self.work_end.get())
+
+        targets = [output_file] + (list(summary_files(summary_file).values()) if summary_file else [])
+        outputs = [path for target in targets for _, path in output_paths(target, output_formats)]
+        job = self.runner.submit(os.path.basename(output_file), outputs, lambda job: process_attendance(
+            input_file, output_file, lunch_start, lunch_end, streaming=streaming, output_formats=output_formats,
+            cache_dir=cache_dir, metrics=metrics, job=job, summary_file=summary_file, work_hours=work_hours))
+        if job is None:
+            messagebox.showwarning("警告", "该输出文件正在处理中，请等待完成或先取消！")
+            return
 
-        threading.Thread(target=self.run_processing).start()
+        self.cancel_button.config(state='normal')
+        self.status.set(f"{job.name}：排队中" if len(self.runner.jobs) > 1 else f"{job.name}：开始处理")
+        if not self.polling:
+            self.polling = True
+            self.root.after(POLL_INTERVAL_MS, self.poll_jobs)
+
+    # 定时读取后台任务的进度和结果；提示框只在这里（界面线程）弹出
+    def poll_jobs(self):
+        progress = self.runner.latest_progress()
+        if progress is not None:
+            self.show_progress(*progress)
+        for job in self.runner.finished_jobs():
+            self.report_result(job)
+
+        if self.runner.jobs:
+            self.root.after(POLL_INTERVAL_MS, self.poll_jobs)
+            return
+        self.polling = False
+        self.progress.stop()
+        self.progress.config(mode='determinate', value=0)
+        self.cancel_button.config(state='disabled')
+
+    def show_progress(self, job, stage, done, total):
+        if job not in self.runner.jobs:
+            return  # 已结束的任务留在队列中的进度
+        waiting = len(self.runner.jobs) - 1
+        suffix = f"（另有 {waiting} 个任务排队）" if waiting else ""
+        if total:
+            self.progress.stop()
+            self.progress.config(mode='determinate', value=done * 100 / total)
+            self.status.set(f"{job.name}：{stage} {done}/{total} 行{suffix}")
+        else:
+            # 总行数未知（读取、写出或流式处理）时进度条只表示正在运行
+            if str(self.progress.cget('mode')) != 'indeterminate':
+                self.progress.config(mode='indeterminate')
+                self.progress.start()
+            self.status.set(f"{job.name}：{stage}" + (f" 已处理 {done} 行" if done else "") + suffix)
+
+    def report_result(self, job):
+        if job.future.cancelled():
+            self.status.set(f"{job.name}：已取消")
+            return
+        error = job.future.exception()
+        if isinstance(error, JobCancelled):
+            self.status.set(f"{job.name}：已取消")
+        elif isinstance(error, AttendanceError):
+            self.status.set(f"{job.name}：失败")
+            messagebox.showerror("错误", str(error))
+        elif error is not None:
+            logging.error(f"处理出错: {error}")
+            self.status.set(f"{job.name}：失败")
+            messagebox.showerror("错误", f"处理出错: {error}")
+        else:
+            self.status.set(f"{job.name}：完成，共 {job.future.result()} 条记录")
+            messagebox.showinfo("成功", "数据处理完成！")
+
+    # 取消正在运行和排队中的任务
+    def cancel_jobs(self):
+        self.runner.cancel_all()
+        self.status.set("正在取消……")
+
+    def close(self):
+        self.runner.shutdown()
+        self.root.destroy()
+
+    def create_metrics(self):
+        if not self.record_metrics.get():
+            return NO_METRICS
+        output_dir = os.path.dirname(os.path.abspath(self.output_file.get()))
+        return RunMetrics('考勤2.0', self.input_file.get(), output_file=os.path.join(output_dir, METRICS_FILE_NAME))
+
+    def clear_cache(self):
+        if not self.input_file.get():
+            messagebox.showwarning("警告", "请选择输入文件！")
+            return
+        ParseCache(default_cache_dir(self.input_file.get())).clear()
+        messagebox.showinfo("成功", "解析缓存已清空！")
 
-    def run_processing(self):
-        process_attendance(
-            self.input_file.get(),
-            self.output_file.get(),
-            self.lunch_start.get(),
-            self.lunch_end.get()
-        )
+    def selected_formats(self):
+        return [fmt for fmt, var in self.output_formats.items() if var.get()]
 
 # 主函数
 def main():